@@ -1,14 +1,28 @@
 import shutil
 import subprocess
+import sys
+import queue
+import hashlib
+import tempfile
 import re
+import math
+import random
+import time
+import mmap
+import multiprocessing
 import json
 import os
 import csv
+import sqlite3
 import yaml
-from collections import Counter
+import glob
+import argparse
+from datetime import datetime
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import xml.etree.ElementTree as ET
 
-from pydriller import Repository  # Install with: pip install pydriller
+import numpy as np                # Installed with pandas
 import pandas as pd               # Install with: pip install pandas
 import matplotlib.pyplot as plt    # Install with: pip install matplotlib
 
@@ -17,13 +31,44 @@ JMH_PATH = "/app/jmh"
 REPO_PATH =  "/app/repo"
 RESULTS_PATH = "/app/results"
 RMINER_JSON_OUTPUT = RESULTS_PATH + "/rminer_result.json"
+RMINER_INDEX = RESULTS_PATH + "/rminer_index.sqlite"
+RMINER_SHARDS = RESULTS_PATH + "/rminer-shards"
+REFACTORING_MINER = "/app/RefactoringMiner/bin/RefactoringMiner"
+BENCHMARK_JAR = JMH_PATH + "/target/JMH-Benchmark-MWK.jar"
 COMMIT_JARS = RESULTS_PATH + "/commit-jars"
 JMH_RESULTS = RESULTS_PATH + "/jmh-results"
+JMH_ROUNDS = RESULTS_PATH + "/jmh-rounds"
 PERF_DATA = RESULTS_PATH + "/perf-data"
+RUN_INFO = PERF_DATA + "/run-info"
+PERF_ROUNDS = PERF_DATA + "/rounds"
+ENERGY_DATA = RESULTS_PATH + "/energy-samples"
+PERF_SAMPLES = PERF_DATA + "/perf-samples.npz"
+RAPL_ROOT = "/sys/devices/virtual/powercap/intel-rapl"
+BUILD_LOGS = RESULTS_PATH + "/build-logs"
+WORKTREES_PATH = "/app/worktrees"
+MAVEN_WORKER_REPOS = "/app/maven-repos"
+JARS_MANIFEST = RESULTS_PATH + "/commit-jars-manifest.csv"
+BUILD_CACHE = RESULTS_PATH + "/build-cache"
+PARENT_JARS = RESULTS_PATH + "/parent-jars"
+PARENT_RUNS = RESULTS_PATH + "/parent-runs"
+BISECT_JARS = RESULTS_PATH + "/bisect/jars"
+BISECT_RUNS = RESULTS_PATH + "/bisect/runs"
+CHECKPOINT_PATH = RESULTS_PATH + "/checkpoint.json"
 
 os.makedirs(COMMIT_JARS, exist_ok=True)
 os.makedirs(JMH_RESULTS, exist_ok=True)
 os.makedirs(PERF_DATA, exist_ok=True)
+os.makedirs(RUN_INFO, exist_ok=True)
+os.makedirs(JMH_ROUNDS, exist_ok=True)
+os.makedirs(PERF_ROUNDS, exist_ok=True)
+os.makedirs(ENERGY_DATA, exist_ok=True)
+os.makedirs(BUILD_LOGS, exist_ok=True)
+os.makedirs(BUILD_CACHE, exist_ok=True)
+os.makedirs(PARENT_JARS, exist_ok=True)
+os.makedirs(PARENT_RUNS, exist_ok=True)
+os.makedirs(BISECT_JARS, exist_ok=True)
+os.makedirs(BISECT_RUNS, exist_ok=True)
+os.makedirs(WORKTREES_PATH, exist_ok=True)
 os.makedirs(RESULTS_PATH, exist_ok=True)
 
 MAVEN_REPO = os.path.expanduser("/root/.m2/repository")  # Maven repository path
@@ -36,6 +81,83 @@ def load_config(file_path='/app/params.yaml'):
 
 params = load_config()
 
+# Maven module (relative to REPO_PATH) whose JAR is benchmarked
+BUILD_MODULE = params['repo'].get('module', params['plot']['plot_title'].lower())
+
+###################################### Pipeline checkpoint ######################################
+# <checkpoint.json> records, for every stage and for every commit of the per-commit stages,
+# the hash of the inputs it was completed with. A rerun skips whatever is still up to date.
+def load_checkpoint(path=CHECKPOINT_PATH):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable checkpoint '{os.path.abspath(path)}': {e}")
+    return {"stages": {}, "commits": {}}
+
+
+def save_checkpoint(checkpoint, path=CHECKPOINT_PATH):
+    # Write to a temporary file first so that a crash never leaves a truncated checkpoint
+    with open(path + ".tmp", 'w') as file:
+        json.dump(checkpoint, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# Hash a list of inputs; existing files are hashed by content, anything else by its JSON form
+def hash_inputs(inputs):
+    digest = hashlib.sha256()
+    for item in inputs:
+        if isinstance(item, str) and os.path.isfile(item):
+            with open(item, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(json.dumps(item, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Return the stored result of a commit in a per-commit stage, or None if it must be (re)done
+def commit_result(checkpoint, stage, commit_hash, inputs_hash):
+    entry = checkpoint["commits"].get(stage, {}).get(commit_hash)
+    if entry and entry["inputs"] == inputs_hash:
+        return entry["result"]
+    return None
+
+
+def mark_commit_done(checkpoint, stage, commit_hash, inputs_hash, result):
+    checkpoint["commits"].setdefault(stage, {})[commit_hash] = {"inputs": inputs_hash, "result": result}
+    save_checkpoint(checkpoint)
+
+
+# Run a stage unless it already completed with the same inputs; False means the pipeline must stop
+def run_stage(checkpoint, name, func, inputs=(), outputs=()):
+    # outputs may also be a function, so that the paths are listed again after the stage has run
+    list_outputs = outputs if callable(outputs) else lambda: outputs
+    inputs_hash = hash_inputs(inputs)
+    stage = checkpoint["stages"].get(name)
+    if stage and stage["inputs"] == inputs_hash and all(os.path.exists(path) for path in list_outputs()):
+        print(f"Skipping stage '{name}': already completed with the same inputs.")
+        return True
+
+    print(f"\n>>> Stage '{name}'")
+    if func() is False or not all(os.path.exists(path) for path in list_outputs()):
+        print(f"Stage '{name}' did not complete. Rerun autoflow.py to resume from this stage.")
+        return False
+
+    checkpoint["stages"][name] = {"inputs": inputs_hash, "completed": datetime.now().isoformat(timespec="seconds")}
+    save_checkpoint(checkpoint)
+    return True
+
+
+# Current HEAD of a repository, or "" if it has not been cloned yet
+def git_head(repo_path=REPO_PATH):
+    if not os.path.isdir(repo_path):
+        return ""
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True)
+    return result.stdout.strip()
+
 ###################################### Clone repository ######################################
 def clone_repository(repo_url, target_directory):
     try:
@@ -46,10 +168,31 @@ def clone_repository(repo_url, target_directory):
         subprocess.run(["git", "clone", repo_url, target_directory], check=True)
 
         print(f"Repository cloned successfully to {target_directory}")
+        return True
     except subprocess.CalledProcessError as e:
         print(f"Error occurred while cloning the repository: {e}")
     except Exception as ex:
         print(f"An unexpected error occurred: {ex}")
+    return False
+
+# Bring an existing clone up to date with its remote instead of cloning again
+def update_repository(target_directory, branch_name='master'):
+    try:
+        subprocess.run(["git", "fetch", "origin", branch_name], cwd=target_directory, check=True)
+        # The clone is a scratch copy: drop the local pom.xml edits of the install stage
+        subprocess.run(["git", "checkout", "--force", branch_name], cwd=target_directory, check=True)
+        subprocess.run(["git", "reset", "--hard", f"origin/{branch_name}"], cwd=target_directory, check=True)
+        print(f"Repository in {target_directory} updated to {git_head(target_directory)}")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Error occurred while updating the repository: {e}")
+    return False
+
+# Tip of a branch on the remote, without fetching it
+def remote_head(repo_url, branch_name='master'):
+    result = subprocess.run(["git", "ls-remote", repo_url, f"refs/heads/{branch_name}"],
+                            capture_output=True, text=True)
+    return result.stdout.split()[0] if result.returncode == 0 and result.stdout else ""
 
 def modify_pom_xml(pom_path, group_id, artifact_id, version):
     try:
@@ -74,15 +217,15 @@ def install_with_maven(project_directory):
         # Run the Maven install command
         subprocess.run(["mvn", "clean", "install", "-DskipTests"], cwd=project_directory, check=True)
         print(f"Project installed successfully to {MAVEN_REPO}")
+        return True
     except subprocess.CalledProcessError as e:
         print(f"Error occurred while running Maven install: {e}")
     except Exception as ex:
         print(f"An unexpected error occurred: {ex}")
+    return False
 
-if __name__ == "__main__":
-    repo_url =  params['repo']['repo_url'] # "https://github.com/x-stream/xstream.git"
-    clone_repository(repo_url, REPO_PATH)
-
+# Give the cloned project our coordinates and install it into the local Maven repository
+def install_repository():
     # Define your custom groupId, artifactId, and version
     group_id = params['repo']['groupId'] # "com.thoughtworks.xstream"
     artifact_id = params['repo']['artifactId'] # "xstream"
@@ -95,18 +238,26 @@ if __name__ == "__main__":
     modify_pom_xml(pom_path, group_id, artifact_id, version)
 
     # Install the project using Maven
-    install_with_maven(REPO_PATH)
+    return install_with_maven(REPO_PATH)
 
 ###################################### Application of RefactoringMiner ######################################
 def run_refactoring_miner(repo, json_output, branch_name='master'):
     """Runs RefactoringMiner with the specified switches on a repository."""
 
     # Find the path for RefactoringMiner from the system's environment PATH variable
-    refactoring_miner_path = "/app/RefactoringMiner/bin/RefactoringMiner"
+    refactoring_miner_path = REFACTORING_MINER
     
     if not refactoring_miner_path:
         print("Error: RefactoringMiner not found in system PATH.")
-        return
+        return False
+
+    # Only analyse commits missing from an earlier run, or split the branch over
+    # several RefactoringMiner processes, if configured
+    workers = params.get('rminer', {}).get('workers', 1)
+    if params.get('rminer', {}).get('incremental') and os.path.exists(json_output):
+        return run_refactoring_miner_incremental(repo, json_output, branch_name, workers)
+    if workers > 1:
+        return run_refactoring_miner_sharded(repo, json_output, branch_name, workers)
 
     # Construct the command for analyzing all commits in the specified branch
     command = [refactoring_miner_path, '-a', repo, branch_name, '-json', json_output]
@@ -124,123 +275,408 @@ def run_refactoring_miner(repo, json_output, branch_name='master'):
 
     if result.returncode == 0:
         print(f"1.1 RefactoringMiner operation successful. Results saved in {os.path.abspath(json_output)}.")
-    else:
-        print(f"1.1 Error running RefactoringMiner: {result.stderr.decode('utf-8')}")
-
+        return True
+    print(f"1.1 Error running RefactoringMiner: {result.stderr.decode('utf-8')}")
+    return False
 
-# Execution
-run_refactoring_miner(REPO_PATH, RMINER_JSON_OUTPUT, branch_name='master')
 
+# Commits of a branch that RefactoringMiner -a analyses, newest first as in its output. -a skips
+# merge commits and the root commit: -c would diff a merge against its first parent and count the
+# refactorings of the whole merged branch again.
+def list_branch_commits(repo, branch_name='master'):
+    result = subprocess.run(["git", "rev-list", "--no-merges", "--min-parents=1", branch_name],
+                            cwd=repo, capture_output=True, text=True, check=True)
+    return result.stdout.split()
 
-###################################### commits_insights ######################################
 
-# Function to count types between sha1s and return a dictionary of counts
-def count_types_between_sha1s(data):
-    sha1_counts = {}
-    current_sha1 = None
-    type_count = 0
+# Per-commit RefactoringMiner output of a sharded run
+def rminer_commit_json(commit_hash):
+    return os.path.join(RMINER_SHARDS, "commits", f"{commit_hash}.json")
 
-    def recursive_search(item):
-        nonlocal current_sha1, type_count
 
-        if isinstance(item, dict):
-            for key, value in item.items():
-                if key == "sha1":
-                    # If a sha1 is already being counted, save it and start a new count
-                    if current_sha1 is not None:
-                        sha1_counts[current_sha1] = type_count
+# Analyse one shard of commits, one RefactoringMiner -c call per commit, in a private clone of <repo>
+def run_rminer_shard(repo, shard_index, commit_hashes):
+    shard_repo = os.path.join(RMINER_SHARDS, f"repo-{shard_index}")
+    if os.path.isdir(os.path.join(shard_repo, ".git")):
+        subprocess.run(["git", "fetch", "--quiet", "origin"], cwd=shard_repo, check=True)
+    else:
+        # --shared borrows the objects of <repo>, so a shard clone costs almost no disk or time
+        subprocess.run(["git", "clone", "--quiet", "--shared", repo, shard_repo], check=True)
+
+    failed = []
+    for commit_hash in commit_hashes:
+        json_output = rminer_commit_json(commit_hash)
+        if os.path.exists(json_output):
+            continue  # Analysed by an earlier, interrupted run
+
+        command = [REFACTORING_MINER, '-c', shard_repo, commit_hash, '-json', json_output + ".tmp"]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode == 0 and os.path.exists(json_output + ".tmp"):
+            os.replace(json_output + ".tmp", json_output)
+        else:
+            print(f"1.1 Error running RefactoringMiner on {commit_hash}: {result.stderr.decode('utf-8')[-500:]}")
+            failed.append(commit_hash)
+    return failed
+
+
+# Concatenate the per-commit outputs into the layout of RefactoringMiner -a
+def merge_rminer_outputs(commit_hashes, json_output):
+    merged = 0
+    with open(json_output + ".tmp", 'w', encoding='utf-8') as file:
+        file.write('{"commits":[')
+        for commit_hash in commit_hashes:
+            if not os.path.exists(rminer_commit_json(commit_hash)):
+                continue
+            for commit in iter_rminer_commits(rminer_commit_json(commit_hash)):
+                file.write(("," if merged else "") + "\n" + json.dumps(commit))
+                merged += 1
+        file.write("]}\n")
+    os.replace(json_output + ".tmp", json_output)
+    return merged
+
+
+# Analyse commits with RefactoringMiner in <workers> parallel shards; return the commits that failed
+def run_rminer_shards(repo, commit_hashes, workers):
+    os.makedirs(os.path.join(RMINER_SHARDS, "commits"), exist_ok=True)
+    workers = max(1, min(workers, len(commit_hashes)))
+
+    # Deal commits out round-robin so that every shard gets a mix of old (small) and new (large) commits
+    shards = [commit_hashes[i::workers] for i in range(workers)]
+    print(f"1. Running RefactoringMiner on {len(commit_hashes)} commits in {workers} shards...")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_rminer_shard, repo, i, shard) for i, shard in enumerate(shards) if shard]
+        for future in as_completed(futures):
+            failed += future.result()
+    if failed:
+        print(f"1.1 RefactoringMiner failed on {len(failed)} commits; they are left out of the results.")
+    return failed
+
+
+# Run RefactoringMiner on <workers> shards of the branch in parallel
+def run_refactoring_miner_sharded(repo, json_output, branch_name, workers):
+    commit_hashes = list_branch_commits(repo, branch_name)
+    try:
+        run_rminer_shards(repo, commit_hashes, workers)
+    except subprocess.CalledProcessError as e:
+        print(f"1.1 Error preparing a RefactoringMiner shard: {e}")
+        return False
+
+    merged = merge_rminer_outputs(commit_hashes, json_output)
+    print(f"1.1 RefactoringMiner operation successful ({merged} commits). Results saved in {os.path.abspath(json_output)}.")
+    return True
+
+
+# sha1 of every commit already in <json_output>, read from the index when it is up to date
+def analysed_commits(json_output, index_path=RMINER_INDEX):
+    if os.path.exists(index_path):
+        with closing(sqlite3.connect(index_path)) as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            if row and row[0] == rminer_source_id(json_output):
+                return {sha1 for (sha1,) in connection.execute("SELECT sha1 FROM commits")}
+    return {commit.get('sha1') for commit in iter_rminer_commits(json_output)}
+
+
+# Append commit objects to the "commits" array of an existing RefactoringMiner JSON file in place
+def append_rminer_commits(json_output, commits):
+    with open(json_output, 'r+b') as file:
+        # Find the closing bracket of the array near the end of the file
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(max(0, size - 4096))
+        tail = file.read()
+        close = tail.rindex(b"]")
+        empty = tail[:close].rstrip().endswith(b"[")
+
+        file.seek(size - len(tail) + close)
+        file.truncate()
+        for commit in commits:
+            file.write(((b"\n" if empty else b",\n") + json.dumps(commit).encode('utf-8')))
+            empty = False
+        file.write(b"]}\n")
+
+
+# Rewrite <json_output> without the commits in <sha1s> and return how many were removed
+def drop_rminer_commits(json_output, sha1s):
+    kept = removed = 0
+    with open(json_output + ".tmp", 'w', encoding='utf-8') as file:
+        file.write('{"commits":[')
+        for commit in iter_rminer_commits(json_output):
+            if commit.get('sha1') in sha1s:
+                removed += 1
+                continue
+            file.write(("," if kept else "") + "\n" + json.dumps(commit))
+            kept += 1
+        file.write("]}\n")
+    os.replace(json_output + ".tmp", json_output)
+    return removed
+
+
+# Analyse only the commits of the branch that are not in <json_output> yet and add them to it.
+# Like -a, and through list_branch_commits, this leaves out merge commits and the root commit.
+def run_refactoring_miner_incremental(repo, json_output, branch_name, workers):
+    known = analysed_commits(json_output)
+
+    # Earlier incremental runs did add merge and root commits: take them out again
+    skipped = set()
+    for selection in ("--min-parents=2", "--max-parents=0"):
+        skipped.update(subprocess.run(["git", "rev-list", selection, branch_name],
+                                      cwd=repo, capture_output=True, text=True, check=True).stdout.split())
+    if known & skipped:
+        removed = drop_rminer_commits(json_output, known & skipped)
+        known -= skipped
+        print(f"1.1 Removed {removed} merge or root commits that RefactoringMiner -a does not analyse.")
+
+    new_commits = [commit_hash for commit_hash in list_branch_commits(repo, branch_name) if commit_hash not in known]
+    if not new_commits:
+        print("1.1 No new commits since the last RefactoringMiner run.")
+        return True
+
+    index_was_current = os.path.exists(RMINER_INDEX) and \
+        rminer_index_source(RMINER_INDEX) == rminer_source_id(json_output)
+    try:
+        run_rminer_shards(repo, new_commits, max(1, workers))
+    except subprocess.CalledProcessError as e:
+        print(f"1.1 Error preparing a RefactoringMiner shard: {e}")
+        return False
 
-                    # Update the current sha1 and reset the type count
-                    current_sha1 = value
-                    type_count = 0
-                elif key == "type":
-                    # Increment type count if a "type" key is found
-                    type_count += 1
+    new_entries = [commit for commit_hash in new_commits if os.path.exists(rminer_commit_json(commit_hash))
+                   for commit in iter_rminer_commits(rminer_commit_json(commit_hash))]
+    append_rminer_commits(json_output, new_entries)
 
-                # Recursively search in the value
-                recursive_search(value)
+    # Keep an up-to-date index current by adding just the new commits
+    if index_was_current:
+        with closing(sqlite3.connect(RMINER_INDEX)) as connection:
+            position = connection.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+            insert_rminer_commits(connection, new_entries, position)
+            connection.execute("UPDATE meta SET value = ? WHERE key = 'source'", (rminer_source_id(json_output),))
+            connection.commit()
 
-        elif isinstance(item, list):
-            for element in item:
-                # Recursively search each element in the list
-                recursive_search(element)
+    print(f"1.1 RefactoringMiner added {len(new_entries)} new commits to {os.path.abspath(json_output)}.")
+    return True
 
-    # Start recursive search from the root of the JSON data
-    recursive_search(data)
 
-    # If the last sha1 is found, add it to the result
-    if current_sha1 is not None:
-        sha1_counts[current_sha1] = type_count
+###################################### commits_insights ######################################
 
-    return sha1_counts
+# Yield the commit objects of a RefactoringMiner JSON file one at a time.
+# Only the commit being decoded is held in memory, however large the file is.
+def iter_rminer_commits(file_path, chunk_size=1 << 20):
+    decoder = json.JSONDecoder()
+    commits_array = re.compile(r'"commits"\s*:\s*\[')
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = file.read(chunk_size)
+        eof = not buffer
+
+        # Move to the first element of the "commits" array
+        match = commits_array.search(buffer)
+        while match is None and not eof:
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[-64:] + chunk
+            match = commits_array.search(buffer)
+        if match is None:
+            print(f"Error: no 'commits' array found in '{os.path.abspath(file_path)}'.")
+            return
+        pos = match.end()
 
+        while True:
+            # Skip separators between elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
 
-# Load the JSON data and count the refactorings
-with open(RMINER_JSON_OUTPUT, 'r') as file:
-    data1 = json.load(file)
-    refactoring_counts = count_types_between_sha1s(data1)
+            try:
+                commit, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues past the buffer: read more and retry
+                if eof:
+                    print(f"Error: '{os.path.abspath(file_path)}' ends in the middle of a commit.")
+                    return
+                chunk = file.read(max(chunk_size, len(buffer) - pos))
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
 
-# Initialize a list to store commit data
-commit_data = []
+            if isinstance(commit, dict):
+                yield commit
 
-# Collect commit data from the repository
-for commit in Repository(REPO_PATH, only_in_branch="master").traverse_commits():
-    commit_data.append({
-        "Commit": commit.hash,
-        "Date": commit.committer_date.date(),  # Ensure only the date part is exported
-        "Files_modified": commit.files,
-        "Insertions": commit.insertions,
-        "Deletions": commit.deletions,
-        "Refactorings_found": refactoring_counts.get(commit.hash, 0)  # Get the refactoring count or 0 if not found
-    })
 
-# Create a DataFrame from the collected data
-df_commits = pd.DataFrame(commit_data)
+###################################### RefactoringMiner index ######################################
+# <rminer_index.sqlite> holds one row per refactoring (sha1, type, file, location), indexed on sha1
+# and type, plus every analysed commit. It is built once per rminer_result.json and serves all reports.
+RMINER_INDEX_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE commits (sha1 TEXT PRIMARY KEY, position INTEGER);
+CREATE TABLE refactorings (sha1 TEXT NOT NULL, type TEXT NOT NULL, file TEXT, location TEXT);
+CREATE INDEX idx_refactorings_sha1 ON refactorings (sha1);
+CREATE INDEX idx_refactorings_type ON refactorings (type);
+"""
 
-# Sort the DataFrame by "Refactorings_found" in descending order
-df_commits.sort_values(by="Refactorings_found", ascending=False, inplace=True)
 
-# Export the DataFrame to a CSV file
-df_commits.to_csv(RESULTS_PATH + '/commits-insights.csv', index=False)
-print("2. Data has been exported to 'commits-insights.csv'.")
+# First code location of a refactoring as (file, "startLine-endLine")
+def refactoring_location(refactoring):
+    for side in ('leftSideLocations', 'rightSideLocations'):
+        for location in refactoring.get(side) or []:
+            if isinstance(location, dict):
+                return location.get('filePath'), f"{location.get('startLine')}-{location.get('endLine')}"
+    return None, None
 
 
-###################################### ref.type_counts ######################################
+# Identify a JSON file by size and modification time, which is enough to detect a new RefactoringMiner run
+def rminer_source_id(json_path):
+    stat = os.stat(json_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
 
-# Function to extract and count occurrences of "type" values from a JSON file
-def extract_type_counts(file_path):
-    # Read the JSON file content as a string
-    with open(file_path, 'r') as jsonfile:
-        json_content = jsonfile.read()
 
-    # Regex pattern to find all "type" attribute values
-    pattern = r'"type"\s*:\s*"([^"]+)"'
-    matches = re.findall(pattern, json_content)
+# Source id recorded in an index, see rminer_source_id()
+def rminer_index_source(index_path):
+    with closing(sqlite3.connect(index_path)) as connection:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    return row[0] if row else None
 
-    # Use Counter to count occurrences of each "type" value
-    type_counts_inner = Counter(matches)
 
-    # Sort the dictionary by the values (occurrences) in descending order
-    sorted_type_counts = dict(sorted(type_counts_inner.items(), key=lambda item: item[1], reverse=True))
+# Insert RefactoringMiner commit objects into an open index; return the next commit position
+def insert_rminer_commits(connection, commits, position=0):
+    rows = []
+    for commit in commits:
+        sha1 = commit.get('sha1')
+        if not sha1:
+            continue
+        connection.execute("INSERT OR REPLACE INTO commits VALUES (?, ?)", (sha1, position))
+        position += 1
+        for refactoring in commit.get('refactorings', []):
+            if isinstance(refactoring, dict) and refactoring.get('type'):
+                rows.append((sha1, refactoring['type'], *refactoring_location(refactoring)))
+        if len(rows) >= 50000:
+            connection.executemany("INSERT INTO refactorings VALUES (?, ?, ?, ?)", rows)
+            rows = []
+    connection.executemany("INSERT INTO refactorings VALUES (?, ?, ?, ?)", rows)
+    return position
+
+
+# Convert rminer_result.json into the SQLite index unless the index is already up to date
+def build_rminer_index(json_path=RMINER_JSON_OUTPUT, index_path=RMINER_INDEX):
+    if not os.path.exists(json_path):
+        print(f"Error: The file '{os.path.abspath(json_path)}' does not exist.")
+        return False
+
+    source_id = rminer_source_id(json_path)
+    if os.path.exists(index_path) and rminer_index_source(index_path) == source_id:
+        print(f"1.2 Refactoring index is up to date: {os.path.abspath(index_path)}")
+        return True
+
+    # Build into a temporary file so that readers never see a half-built index
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(RMINER_INDEX_SCHEMA)
+
+        position = insert_rminer_commits(connection, iter_rminer_commits(json_path))
+        connection.execute("INSERT INTO meta VALUES ('source', ?)", (source_id,))
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, index_path)
+
+    print(f"1.2 Refactoring index of {position} commits saved in {os.path.abspath(index_path)}")
+    return True
+
+
+# Number of refactorings of every analysed commit
+def query_refactoring_counts(index_path=RMINER_INDEX):
+    with closing(sqlite3.connect(index_path)) as connection:
+        return dict(connection.execute(
+            "SELECT c.sha1, COUNT(r.sha1) FROM commits c LEFT JOIN refactorings r ON r.sha1 = c.sha1 "
+            "GROUP BY c.sha1"))
+
+
+# Occurrences of every refactoring type, most frequent first
+def query_type_counts(index_path=RMINER_INDEX):
+    with closing(sqlite3.connect(index_path)) as connection:
+        return dict(connection.execute(
+            "SELECT type, COUNT(*) FROM refactorings GROUP BY type ORDER BY COUNT(*) DESC, MIN(rowid)"))
+
+
+# Yield Commit/Date/Files_modified/Insertions/Deletions for every commit of a branch, oldest first,
+# from a single `git log --numstat` stream. Merges are diffed against their first parent and renames
+# count as one file, which gives the same numbers as PyDriller's commit.files/insertions/deletions.
+def iter_commit_stats(repo, branch_name='master'):
+    command = ["git", "log", branch_name, "--reverse", "--numstat",
+               "--diff-merges=first-parent", "--format=%x1e%H %cs"]
+    with subprocess.Popen(command, cwd=repo, stdout=subprocess.PIPE, text=True,
+                          encoding='utf-8', errors='replace') as process:
+        current = None
+        for line in process.stdout:
+            if line.startswith("\x1e"):
+                if current:
+                    yield current
+                commit_hash, date = line[1:].split()
+                current = {"Commit": commit_hash, "Date": date, "Files_modified": 0, "Insertions": 0, "Deletions": 0}
+            elif current and line.strip():
+                # "<added>\t<deleted>\t<path>", with "-" instead of counts for binary files
+                added, deleted, _ = line.split("\t", 2)
+                current["Files_modified"] += 1
+                current["Insertions"] += int(added) if added != "-" else 0
+                current["Deletions"] += int(deleted) if deleted != "-" else 0
+        if current:
+            yield current
+
+    if process.returncode != 0:
+        print(f"Error: git log exited with status {process.returncode} in '{os.path.abspath(repo)}'.")
+
+
+# Export per-commit metadata and refactoring counts to <commits-insights.csv>
+def export_commits_insights():
+    # Count the refactorings of each commit
+    refactoring_counts = query_refactoring_counts()
+
+    # Initialize a list to store commit data
+    commit_data = []
+
+    # Collect commit data from the repository
+    for commit in iter_commit_stats(REPO_PATH, branch_name="master"):
+        # Get the refactoring count or 0 if not found
+        commit["Refactorings_found"] = refactoring_counts.get(commit["Commit"], 0)
+        commit_data.append(commit)
+
+    # Create a DataFrame from the collected data
+    df_commits = pd.DataFrame(commit_data)
+
+    # Sort the DataFrame by "Refactorings_found" in descending order
+    df_commits.sort_values(by="Refactorings_found", ascending=False, inplace=True)
+
+    # Export the DataFrame to a CSV file
+    df_commits.to_csv(RESULTS_PATH + '/commits-insights.csv', index=False)
+    print("2. Data has been exported to 'commits-insights.csv'.")
 
-    return sorted_type_counts
 
+###################################### ref.type_counts ######################################
 
-# Example usage of the type counts function
-type_counts_outer = extract_type_counts(RMINER_JSON_OUTPUT)
+# Export the occurrences of each refactoring type to <refs-type-counts.csv>
+def export_type_counts():
+    # Sort the refactoring types by their occurrences in descending order
+    type_counts_outer = query_type_counts()
 
-# Convert the dictionary to a DataFrame
-df_type_counts = pd.DataFrame(type_counts_outer.items(), columns=["Refactorings_found", "Occurrences"])
+    # Convert the dictionary to a DataFrame
+    df_type_counts = pd.DataFrame(type_counts_outer.items(), columns=["Refactorings_found", "Occurrences"])
 
-# Export the DataFrame to a CSV file
-df_type_counts.to_csv(RESULTS_PATH + '/refs-type-counts.csv', index=False)
-print("3. Data has been exported to 'refs-type-counts.csv'.")
+    # Export the DataFrame to a CSV file
+    df_type_counts.to_csv(RESULTS_PATH + '/refs-type-counts.csv', index=False)
+    print("3. Data has been exported to 'refs-type-counts.csv'.")
 
 
-###################################### maven build and success/failed status ######################################
+###################################### maven build, success/failed status and commit JARs ######################################
 
 # Function to update the Maven compiler options in pom.xml
-def update_maven_compiler_options(pom_path):
+def update_maven_compiler_options(pom_path, verbose=True):
     try:
         ET.register_namespace('', 'http://maven.apache.org/POM/4.0.0')
         tree = ET.parse(pom_path)
@@ -286,152 +722,814 @@ def update_maven_compiler_options(pom_path):
         target.text = '8'
 
         tree.write(pom_path, encoding='utf-8', xml_declaration=True)
-        print(f"Updated compiler options in {pom_path} to Java 8")
+        if verbose:
+            print(f"Updated compiler options in {pom_path} to Java 8")
     except Exception as e:
         print(f"Failed to update {pom_path}: {e}")
 
 
-# Load the CSV into a DataFrame
-df = pd.read_csv(RESULTS_PATH + '/commits-insights.csv')
-
-# Ensure the "Status" and "Error_cause" columns exist
-if 'Status' not in df.columns:
-    df['Status'] = ""
-if 'Error_cause' not in df.columns:
-    df['Error_cause'] = ""
-
-# Filter commits with 'Refactorings_found' >= 20
-filtered_commits = df[df['Refactorings_found'] >= 20]['Commit'].tolist()
-
-# Process each commit
-if not filtered_commits:
-    print("No commits found with 'Refactorings_found' >= 20.")
-else:
-    for commit_hash in filtered_commits:
-        print(f"\nProcessing commit: {commit_hash}")
-        os.chdir(REPO_PATH)
-
-        # Stash any local changes, including untracked files
-        try:
-            subprocess.run(["git", "stash", "-u"], check=True)
-            print("Local changes (including untracked files) stashed successfully.")
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to stash local changes: {e}")
-            continue
-
-        # Clean untracked files if any exist
-        try:
-            subprocess.run(["git", "clean", "-fd"], check=True)
-            print("Untracked files cleaned successfully.")
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to clean untracked files: {e}")
-            continue
-
-        # Checkout to the specific commit
-        try:
-            subprocess.run(["git", "checkout", commit_hash], check=True)
-            print(f"Checked out to commit {commit_hash}")
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to checkout to commit {commit_hash}: {e}")
-            df.loc[df['Commit'] == commit_hash, ['Status', 'Error_cause']] = ['Failed', str(e)]
-            continue
+# Remove a commit worktree and its registration in REPO_PATH
+def remove_worktree(worktree_path):
+    subprocess.run(["git", "worktree", "remove", "--force", worktree_path],
+                   cwd=REPO_PATH, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    shutil.rmtree(worktree_path, ignore_errors=True)
+
+
+# Create a detached worktree for a commit so that parallel builds never share a checkout
+def add_worktree(commit_hash):
+    worktree_path = os.path.join(WORKTREES_PATH, commit_hash)
+    if os.path.exists(worktree_path):
+        remove_worktree(worktree_path)
+    subprocess.run(["git", "worktree", "add", "--force", "--detach", worktree_path, commit_hash],
+                   cwd=REPO_PATH, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return worktree_path
+
+
+# Copy the main JAR(s) of a built module into COMMIT_JARS and return their new names
+def collect_commit_jars(worktree_path, commit_hash):
+    collected = []
+    target_dir = os.path.join(worktree_path, BUILD_MODULE, "target")
+    if not os.path.exists(target_dir):
+        return collected
+
+    # Copy and rename only the main JAR file to avoid duplications
+    jar_files = [f for f in os.listdir(target_dir) if f.endswith(".jar")]
+    for jar_file in jar_files:
+        if "tests" not in jar_file and "sources" not in jar_file and "test-sources" not in jar_file:
+            old_jar_path = os.path.join(target_dir, jar_file)
+            new_jar_name = f"{commit_hash[:8]}-{jar_file}"
+            shutil.copy2(old_jar_path, os.path.join(COMMIT_JARS, new_jar_name))
+            collected.append(new_jar_name)
+    return collected
+
+
+# Local Maven repository of build worker <index>, seeded once with a copy of MAVEN_REPO. Maven does
+# not lock its local repository, so concurrent builds downloading the same artifact could corrupt it.
+def worker_maven_repo(index):
+    repo_path = os.path.join(MAVEN_WORKER_REPOS, str(index))
+    if not os.path.exists(repo_path):
+        # Copy under a temporary name so that an interrupted copy is never used
+        tmp_path = repo_path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if os.path.isdir(MAVEN_REPO):
+            shutil.copytree(MAVEN_REPO, tmp_path, symlinks=True)
+        else:
+            os.makedirs(tmp_path)
+        os.replace(tmp_path, repo_path)
+    return repo_path
+
+
+# Build one commit in its own worktree, keep its JAR and return (commit, status, error cause, jars).
+# <maven_repos> is a queue of worker repositories: the build holds one of them while Maven runs.
+def build_commit(commit_hash, maven_repos=None):
+    try:
+        worktree_path = add_worktree(commit_hash)
+    except subprocess.CalledProcessError as e:
+        return commit_hash, 'Failed', str(e), []
 
+    maven_repo = maven_repos.get() if maven_repos else None
+    try:
         # Update pom.xml if present
-        pom_path1 = os.path.join(REPO_PATH, 'pom.xml')
+        pom_path1 = os.path.join(worktree_path, 'pom.xml')
         if os.path.exists(pom_path1):
             update_maven_compiler_options(pom_path1)
 
-        # Compile the project
-        try:
-            subprocess.run(["mvn", "clean", "package", "-Dmaven.test.skip=true", "-Drat.skip=true"], check=True)
-            print(f"Project compiled successfully for commit {commit_hash}")
-            df.loc[df['Commit'] == commit_hash, 'Status'] = 'Success'
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to compile project at commit {commit_hash}: {e}")
-            df.loc[df['Commit'] == commit_hash, ['Status', 'Error_cause']] = ['Failed', str(e)]
-
-# Save the updated DataFrame back to a CSV file
-df.to_csv(RESULTS_PATH + '/commits-insights.csv', index=False)
-print("Builds statuses have been recorded in 'commits-insights.csv'.")
-
-# Filter for commits with 'Refactorings_found' >= 20 and 'Success' in 'Status'
-filtered_commits = df[(df['Refactorings_found'] >= 20) & (df['Status'] == 'Success')]['Commit'].tolist()
-
-# Process each filtered commit
-if not filtered_commits:
-    print("5. No commits found with 'Refactorings_found' >= 20 and status 'Success'.")
-else:
-    for commit_hash in filtered_commits:
-        print(f"\nProcessing commit: {commit_hash}")
-        os.chdir(REPO_PATH)
-
-        # Stash any local changes
-        try:
-            subprocess.run(["git", "stash"], check=True)
-            print("5.1 Local changes stashed successfully.")
-        except subprocess.CalledProcessError as e:
-            print(f"5.1 Failed to stash local changes: {e}")
-            continue
+        # Maven output of concurrent builds goes to one log file per commit
+        log_path = os.path.join(BUILD_LOGS, f"{commit_hash[:8]}-build.log")
+        with open(log_path, "w") as log:
+            subprocess.run(["mvn", "-B", "clean", "package", "-Dmaven.test.skip=true", "-Drat.skip=true",
+                            "-Dmaven.javadoc.skip=true"] +
+                           ([f"-Dmaven.repo.local={maven_repo}"] if maven_repo else []),
+                           cwd=worktree_path, stdout=log, stderr=subprocess.STDOUT, check=True)
+        return commit_hash, 'Success', "", collect_commit_jars(worktree_path, commit_hash)
+    except subprocess.CalledProcessError as e:
+        return commit_hash, 'Failed', str(e), []
+    finally:
+        if maven_repo:
+            maven_repos.put(maven_repo)
+        remove_worktree(worktree_path)
 
-        # Checkout to the specific commit
-        try:
-            subprocess.run(["git", "checkout", commit_hash], check=True)
-            print(f"5.2 Checked out to commit {commit_hash}")
-        except subprocess.CalledProcessError as e:
-            print(f"5.2 Failed to checkout to commit {commit_hash}: {e}")
-            continue
 
-        # Clean previous build artifacts
-        subprocess.run(["mvn", "clean"], check=True)
+# Cache key of a commit: git tree of the built module plus the patched root pom.xml
+def build_cache_key(commit_hash):
+    try:
+        module_tree = subprocess.run(["git", "rev-parse", f"{commit_hash}:{BUILD_MODULE}"],
+                                     cwd=REPO_PATH, capture_output=True, text=True)
+        if module_tree.returncode != 0:
+            # Single-module layouts: fall back to the whole source tree
+            module_tree = subprocess.run(["git", "rev-parse", f"{commit_hash}^{{tree}}"],
+                                         cwd=REPO_PATH, capture_output=True, text=True, check=True)
+
+        key = hashlib.sha256(module_tree.stdout.strip().encode())
+        pom = subprocess.run(["git", "show", f"{commit_hash}:pom.xml"], cwd=REPO_PATH, capture_output=True)
+        if pom.returncode == 0:
+            # Hash the pom exactly as the build will see it after update_maven_compiler_options
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                tmp_pom = os.path.join(tmp_dir, "pom.xml")
+                with open(tmp_pom, "wb") as file:
+                    file.write(pom.stdout)
+                update_maven_compiler_options(tmp_pom, verbose=False)
+                with open(tmp_pom, "rb") as file:
+                    key.update(file.read())
+        return key.hexdigest()
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to compute the build cache key of {commit_hash}: {e}")
+        return None
+
+
+# Copy a commit's cached JAR(s) into COMMIT_JARS and return its build result
+def restore_from_cache(cache_key, commit_hash):
+    entry_dir = os.path.join(BUILD_CACHE, cache_key)
+    with open(os.path.join(entry_dir, "entry.json"), "r") as file:
+        entry = json.load(file)
+
+    jars = []
+    for jar in entry["jars"]:
+        new_jar_name = f"{commit_hash[:8]}-{jar}"
+        new_jar_path = os.path.join(COMMIT_JARS, new_jar_name)
+        if not os.path.exists(new_jar_path):
+            shutil.copy2(os.path.join(entry_dir, jar), new_jar_path)
+        jars.append(new_jar_name)
+    return commit_hash, entry["status"], entry["error_cause"], jars
+
+
+# Store a successful build result and its JAR(s) under its cache key. Failures are not cached:
+# a Maven download error or an out-of-memory kill must not be replayed on every later run.
+def store_in_cache(cache_key, result):
+    commit_hash, status, error_cause, jars = result
+    if status != 'Success':
+        return False
+    entry_dir = os.path.join(BUILD_CACHE, cache_key)
+    os.makedirs(entry_dir, exist_ok=True)
+
+    cached_jars = []
+    for jar in jars:
+        cached_jar = jar[len(commit_hash[:8]) + 1:]  # Strip the "<commit>-" prefix
+        shutil.copy2(os.path.join(COMMIT_JARS, jar), os.path.join(entry_dir, cached_jar))
+        cached_jars.append(cached_jar)
+
+    # Write entry.json last so that a half-written entry is never treated as a hit
+    entry = {"commit": commit_hash, "status": status, "error_cause": error_cause, "jars": cached_jars}
+    with open(os.path.join(entry_dir, "entry.json.tmp"), "w") as file:
+        json.dump(entry, file, indent=2)
+    os.replace(os.path.join(entry_dir, "entry.json.tmp"), os.path.join(entry_dir, "entry.json"))
+    return True
+
+
+# Cache key with a usable entry: a successful build (caches written before failures were
+# skipped may still hold failed ones, which are built again)
+def cache_hit(cache_key):
+    entry_path = os.path.join(BUILD_CACHE, cache_key, "entry.json") if cache_key else None
+    if not entry_path or not os.path.exists(entry_path):
+        return False
+    with open(entry_path, "r") as file:
+        return json.load(file).get("status") == 'Success'
+
+
+# Build commits concurrently, at most <workers> Maven processes at a time
+def run_build_farm(commit_hashes, workers, use_cache=True, on_result=None):
+    # Drop worktrees left behind by an interrupted run
+    subprocess.run(["git", "worktree", "prune"], cwd=REPO_PATH, check=False)
+
+    # Group commits that share a cache key so that each key is built at most once
+    groups = {}
+    for commit_hash in commit_hashes:
+        cache_key = build_cache_key(commit_hash) if use_cache else None
+        groups.setdefault(cache_key or commit_hash, (cache_key, []))[1].append(commit_hash)
 
-        # Update pom.xml if present
-        pom_path1 = os.path.join(REPO_PATH, 'pom.xml')
-        if os.path.exists(pom_path1):
-            update_maven_compiler_options(pom_path1)
+    results = []
+    pending = []
+    for cache_key, group in groups.values():
+        if cache_hit(cache_key):
+            for commit_hash in group:
+                results.append(restore_from_cache(cache_key, commit_hash))
+                if on_result:
+                    on_result(results[-1])
+        else:
+            pending.append((cache_key, group))
+    print(f"4.1 {len(results)} commits served from the build cache, {len(pending)} builds to run.")
+
+    # One local Maven repository per worker, so that no two Maven processes write to the same one
+    maven_repos = queue.Queue()
+    for index in range(min(workers, len(pending))):
+        maven_repos.put(worker_maven_repo(index))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_commit, group[0], maven_repos): (cache_key, group)
+                   for cache_key, group in pending}
+        for future in as_completed(futures):
+            cache_key, group = futures[future]
+            result = future.result()
+            print(f"4.1 [{len(results) + 1}/{len(commit_hashes)}] {result[1]}: {result[0]} {' '.join(result[3])}")
+
+            group_results = [result]
+            if cache_key and store_in_cache(cache_key, result):
+                group_results += [restore_from_cache(cache_key, commit_hash) for commit_hash in group[1:]]
+            else:
+                # Same tree, same outcome: the other commits of the group share the failure
+                group_results += [(commit_hash, result[1], result[2], []) for commit_hash in group[1:]]
+            for group_result in group_results:
+                results.append(group_result)
+                if on_result:
+                    on_result(group_result)
+    return results
 
-        # Compile the project
-        try:
-            subprocess.run(["mvn", "package", "-Dmaven.test.skip=true", "-Drat.skip=true", "-Dmaven.javadoc.skip=true"], check=True)
-            print(f"5.3 Project compiled successfully for commit {commit_hash}")
-
-            # Copy and rename only the main JAR file to avoid duplications
-            target_dir = os.path.join(REPO_PATH, params['plot']['plot_title'].lower() + "/target")
-            if os.path.exists(target_dir):
-                jar_files = [f for f in os.listdir(target_dir) if f.endswith(".jar")]
-                for jar_file in jar_files:
-                    if "tests" not in jar_file and "sources" not in jar_file and "test-sources" not in jar_file:
-                        old_jar_path = os.path.join(target_dir, jar_file)
-                        new_jar_name = f"{commit_hash[:8]}-{jar_file}"
-                        new_jar_path = os.path.join(COMMIT_JARS, new_jar_name)
-                        shutil.copy2(old_jar_path, new_jar_path)
-                        print(f"Copied and renamed {jar_file} to {new_jar_name}")
-        except subprocess.CalledProcessError as e:
-            print(f"5.3 Failed to compile project at commit {commit_hash}: {e}")
-
-print("5.4 Process completed.\n")
+
+# Record which JAR in COMMIT_JARS belongs to which commit
+def write_jars_manifest(build_results, manifest_path):
+    with open(manifest_path, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Commit", "Jar"])
+        for commit_hash, status, _, jars in build_results:
+            for jar in jars:
+                writer.writerow([commit_hash, jar])
+    print(f"4.2 JAR manifest written to '{os.path.abspath(manifest_path)}'")
+
+
+# Paths of the JARs listed in the manifest, none while there is no manifest
+def manifest_jar_paths(manifest_path=JARS_MANIFEST):
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, mode="r") as file:
+        return [os.path.join(COMMIT_JARS, row["Jar"]) for row in csv.DictReader(file)]
+
+
+# Build the filtered commits and record their statuses in <commits-insights.csv>
+def build_filtered_commits(checkpoint):
+    # Load the CSV into a DataFrame
+    df = pd.read_csv(RESULTS_PATH + '/commits-insights.csv')
+
+    # Ensure the "Status" and "Error_cause" columns exist
+    if 'Status' not in df.columns:
+        df['Status'] = ""
+    if 'Error_cause' not in df.columns:
+        df['Error_cause'] = ""
+    df[['Status', 'Error_cause']] = df[['Status', 'Error_cause']].fillna("").astype(str)
+
+    # Filter commits with 'Refactorings_found' >= 20
+    filtered_commits = df[df['Refactorings_found'] >= 20]['Commit'].tolist()
+
+    # Build every filtered commit, then record all statuses in one pass
+    build_results = []
+    if not filtered_commits:
+        print("No commits found with 'Refactorings_found' >= 20.")
+    else:
+        build_params = params.get('build', {})
+        build_inputs = hash_inputs([build_params, BUILD_MODULE])
+
+        # Commits finished by an earlier, interrupted run are not built again, unless their JARs
+        # are no longer in COMMIT_JARS (cleaned up or only partly copied)
+        pending_commits = []
+        for commit_hash in filtered_commits:
+            result = commit_result(checkpoint, "build", commit_hash, build_inputs)
+            if result is not None and all(os.path.exists(os.path.join(COMMIT_JARS, jar)) for jar in result[3]):
+                build_results.append(tuple(result))
+            else:
+                pending_commits.append(commit_hash)
+
+        build_workers = build_params.get('workers') or os.cpu_count() or 1
+        print(f"4. Building {len(pending_commits)} commits with {build_workers} parallel workers "
+              f"({len(build_results)} already done)...")
+        build_results += run_build_farm(
+            pending_commits, build_workers, build_params.get('cache', True),
+            on_result=lambda result: mark_commit_done(checkpoint, "build", result[0], build_inputs, list(result)))
+
+        status_map = {result[0]: result[1] for result in build_results}
+        cause_map = {result[0]: result[2] for result in build_results}
+        built = df['Commit'].isin(status_map)
+        df.loc[built, 'Status'] = df.loc[built, 'Commit'].map(status_map)
+        df.loc[built, 'Error_cause'] = df.loc[built, 'Commit'].map(cause_map)
+    write_jars_manifest(build_results, JARS_MANIFEST)
+
+    # Save the updated DataFrame back to a CSV file
+    df.to_csv(RESULTS_PATH + '/commits-insights.csv', index=False)
+    print("Builds statuses have been recorded in 'commits-insights.csv'.")
+
+
+###################################### Energy sampler ######################################
+# Out-of-band RAPL sampling: a separate process polls the powercap counters at energy.rate_hz into
+# a memory-mapped ring buffer while JMH runs, and the energy of every iteration is integrated
+# afterwards from the start_ns/end_ns the harness writes to its sidecar records. Both sides use
+# CLOCK_MONOTONIC (System.nanoTime() / time.monotonic_ns()). The harness runs SampledApp then, whose
+# state has no per-invocation fixtures, and the operations of every iteration come from the JMH result.
+
+# RAPL domains below <root> as (name, energy_uj path, max_energy_range_uj, counted in the package total)
+def rapl_domains(root):
+    def children(parent):
+        prefix = os.path.basename(parent) + ":" if os.path.basename(parent).startswith("intel-rapl:") else "intel-rapl:"
+        found = [path for path in glob.glob(os.path.join(parent, prefix + "*"))
+                 if os.path.basename(path)[len(prefix):].isdigit() and os.path.exists(os.path.join(path, "energy_uj"))]
+        return sorted(found, key=lambda path: int(os.path.basename(path)[len(prefix):]))
+
+    def read(path, default=""):
+        if not os.path.exists(path):
+            return default
+        with open(path, 'r') as file:
+            return file.read().strip()
+
+    domains = []
+    for package in children(root):
+        package_name = read(os.path.join(package, "name"), os.path.basename(package))
+        for domain, name in [(package, package_name)] + [
+                (sub, package_name + "/" + read(os.path.join(sub, "name"), os.path.basename(sub)))
+                for sub in children(package)]:
+            domains.append((name, os.path.join(domain, "energy_uj"),
+                            int(read(os.path.join(domain, "max_energy_range_uj"), "0")),
+                            domain == package and not package_name.startswith("psys")))
+    return domains
+
+
+# Sampler process: rows of [time_ns, cumulative uJ of every domain] into the ring buffer of <buffer_path>,
+# whose first 8 bytes count the rows written so far
+def energy_sampler(buffer_path, domains, rate_hz, stop_event):
+    fds = [os.open(path, os.O_RDONLY) for _, path, _, _ in domains]
+    last = [int(os.pread(fd, 32, 0)) for fd in fds]
+    totals = [0] * len(fds)
+    period = int(1e9 / rate_hz)
+    with open(buffer_path, "r+b") as file, closing(mmap.mmap(file.fileno(), 0)) as buffer:
+        count = np.ndarray((1,), np.int64, buffer, 0)
+        rows = np.ndarray(((len(buffer) - 8) // (8 * (1 + len(fds))), 1 + len(fds)), np.int64, buffer, 8)
+        written, next_ns = 0, time.monotonic_ns()
+        while not stop_event.is_set():
+            now = time.monotonic_ns()
+            for i, fd in enumerate(fds):
+                value = int(os.pread(fd, 32, 0))
+                # The counter wrapped around at max_energy_range_uj since the last sample
+                totals[i] += value - last[i] if value >= last[i] else value - last[i] + domains[i][2]
+                last[i] = value
+            rows[written % len(rows)] = [now] + totals
+            written += 1
+            count[0] = written
+            next_ns += period
+            delay = next_ns - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            else:
+                next_ns = time.monotonic_ns()
+        del count, rows
+    for fd in fds:
+        os.close(fd)
+
+
+# Start the sampler for one JMH run writing to <energy_dir>, over the domains of <package> only when set,
+# or None when it is disabled or there is no RAPL
+def start_energy_sampler(energy_dir, package=None):
+    energy_params = params.get('energy', {})
+    if not energy_params.get('sampler', False):
+        return None
+    domains = rapl_domains(energy_params.get('root', RAPL_ROOT))
+    if package is not None:
+        domains = [domain for domain in domains if domain[0].split("/")[0] == f"package-{package}"]
+    if not domains:
+        print(f"6.4 No RAPL domains under {energy_params.get('root', RAPL_ROOT)}, energy sampler not started.")
+        return None
+
+    rate_hz = energy_params.get('rate_hz', 1000)
+    slots = int(rate_hz * energy_params.get('buffer_seconds', 3600))
+    buffer_path = os.path.join(energy_dir, "sampler.bin")
+    with open(buffer_path, "wb") as file:
+        file.truncate(8 + slots * 8 * (1 + len(domains)))
+
+    # A fresh interpreter rather than a fork: benchmarks run from worker threads, and a forked child
+    # could wait forever on a lock that another thread held at the time of the fork
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    process = context.Process(target=energy_sampler, args=(buffer_path, domains, rate_hz, stop_event), daemon=True)
+    process.start()
+
+    # The interpreter takes a moment to start: wait for the first sample before JMH runs
+    with open(buffer_path, "rb") as file:
+        while process.is_alive() and np.frombuffer(os.pread(file.fileno(), 8, 0), np.int64)[0] == 0:
+            time.sleep(0.01)
+    if not process.is_alive():
+        print(f"6.4 The energy sampler exited with code {process.exitcode}, energy sampler not running.")
+        return None
+    return process, stop_event, buffer_path, domains
+
+
+# Seconds per operation of every measurement iteration of a JMH result file, per (benchmark, params)
+# and fork: the time per operation of the time modes, the inverse of the throughput of thrpt
+def jmh_iteration_seconds(result_file):
+    unit_seconds = {"ns": 1e-9, "us": 1e-6, "ms": 1e-3, "s": 1, "min": 60, "hr": 3600, "day": 86400}
+    iterations = {}
+    with open(result_file, "r") as file:
+        entries = json.load(file)
+    for entry in entries:
+        metric = entry["primaryMetric"]
+        unit = metric.get("scoreUnit", "s/op")
+        if metric.get("rawDataHistogram"):
+            forks = [[sum(value * count for value, count in iteration) / sum(count for _, count in iteration)
+                      for iteration in fork] for fork in metric["rawDataHistogram"]]
+        else:
+            forks = metric.get("rawData", [])
+        if unit.startswith("ops/"):
+            seconds = [[unit_seconds[unit[4:]] / value if value else None for value in fork] for fork in forks]
+        else:
+            seconds = [[value * unit_seconds[unit.split("/")[0]] for value in fork] for fork in forks]
+        key = (entry["benchmark"], json.dumps(entry.get("params", {}), sort_keys=True))
+        iterations.setdefault(key, []).extend(seconds)
+    return iterations
+
+
+# Stop the sampler and add the integrated energy of every iteration to the sidecar records of <energy_dir>,
+# with the operations of the measurement iterations from the JMH result in <result_file>
+def stop_energy_sampler(sampler, energy_dir, result_file):
+    process, stop_event, buffer_path, domains = sampler
+    stop_event.set()
+    process.join()
+
+    with open(buffer_path, "rb") as file:
+        data = file.read()
+    written = int(np.frombuffer(data, np.int64, 1)[0])
+    rows = np.frombuffer(data, np.int64, offset=8).reshape(-1, 1 + len(domains))
+    if written > len(rows):
+        print(f"6.4 Energy sampler buffer wrapped; only the last {len(rows)} samples are kept.")
+        rows = np.roll(rows, -(written % len(rows)), axis=0)
+    else:
+        rows = rows[:written]
+    os.remove(buffer_path)
+    if len(rows) < 2:
+        print("6.4 Energy sampler recorded no samples.")
+        return
+
+    # Every fork is one JVM writing one sidecar file for one (benchmark, params); forks of the same
+    # pair come in the order of the JMH result's raw data
+    try:
+        iteration_seconds = jmh_iteration_seconds(result_file)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"6.4 No operation counts from '{os.path.abspath(result_file)}': {e}")
+        iteration_seconds = {}
+    sidecars = []
+    for path in glob.glob(os.path.join(energy_dir, "*.jsonl")):
+        with open(path, 'r') as file:
+            records = [json.loads(line) for line in file if line.strip()]
+        if records:
+            sidecars.append((records[0].get("start_ns", 0), path, records))
+    forks_seen = {}
+
+    times = rows[:, 0]
+    integrated = skipped = 0
+    for _, path, records in sorted(sidecars):
+        key = (records[0]["benchmark"], json.dumps(records[0]["params"], sort_keys=True))
+        fork = forks_seen[key] = forks_seen.get(key, -1) + 1
+        seconds = iteration_seconds.get(key, [])
+        for record in records:
+            if record["phase"] == "measurement" and fork < len(seconds) and record["iteration"] <= len(seconds[fork]):
+                per_op = seconds[fork][record["iteration"] - 1]
+                if per_op:
+                    record["ops"] = (record["end_ns"] - record["start_ns"]) / 1e9 / per_op
+            if not times[0] <= record.get("start_ns", -1) <= record.get("end_ns", -1) <= times[-1]:
+                skipped += 1
+                continue
+            # Energy of every domain between start and end, interpolated between the samples around them
+            domain_uj = [float(np.diff(np.interp([record["start_ns"], record["end_ns"]], times, rows[:, 1 + i]))[0])
+                         for i in range(len(domains))]
+            record["sampler_uj"] = sum(uj for uj, domain in zip(domain_uj, domains) if domain[3])
+            record["domains"] = {domain[0]: uj / 1e6 for uj, domain in zip(domain_uj, domains)}
+            integrated += 1
+        with open(path + ".tmp", 'w') as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+        os.replace(path + ".tmp", path)
+    print(f"6.4 Integrated sampled energy over {integrated} iterations ({skipped} outside the sampled period).")
 
 ###################################### Calling commits_jmh.py ######################################
 
-# Maven install command
-MAVEN_INSTALL_CMD = [
-    "mvn", "install:install-file",
-    "-DgroupId=" + params['repo']['groupId'],
-    "-DartifactId=" + params['repo']['artifactId'],
-    "-Dversion=" + params['repo']['version'],
-    "-Dpackaging=jar",
-    # "-DgroupId=com.thoughtworks.xstream",
-    # "-DartifactId=xstream",
-    # "-Dversion=waheed",
-    # "-Dpackaging=jar",
-]
-
-
-def process_jars():
+# Build the JMH harness once. xstream is a "provided" dependency of jmh-xstream, so the
+# harness JAR holds only JMH and the benchmark classes and each commit JAR is put next to it
+# on the classpath at run time instead of being installed into ~/.m2 and shaded in.
+def build_benchmark_harness():
+    try:
+        subprocess.run(["mvn", "-B", "clean", "package"], cwd=JMH_PATH, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"6.0 Failed to build the benchmark harness: {e}")
+        return False
+
+    if not os.path.exists(BENCHMARK_JAR):
+        print(f"6.0 Benchmark JAR not found: {BENCHMARK_JAR}")
+        return False
+    print(f"6.0 Created benchmark harness: {BENCHMARK_JAR}")
+    return True
+
+
+# Command that runs the JMH harness against one commit JAR
+def jmh_command(jar_path, result_file, jmh_args=()):
+    return ["java",
+            "--add-opens", "java.base/java.util=ALL-UNNAMED",
+            "--add-opens", "java.base/java.lang.reflect=ALL-UNNAMED",
+            "--add-opens", "java.base/java.text=ALL-UNNAMED",
+            "--add-opens", "java.desktop/java.awt.font=ALL-UNNAMED",
+            "-cp", os.pathsep.join([BENCHMARK_JAR, jar_path]),
+            "org.openjdk.jmh.Main",
+            "-rff", result_file,
+            "-rf", "json"] + list(jmh_args)
+
+
+# JMH command line options for the benchmark modes, warmup, measurement settings and @Param
+# values in params.yaml; they override the annotations of the benchmark methods
+def jmh_options(benchmark_params):
+    modes = benchmark_params.get('modes', ['avgt'])
+    options = ["-bm", ",".join(modes if isinstance(modes, list) else [modes])]
+    for key, flag in (("warmup_iterations", "-wi"), ("warmup_time", "-w"),
+                      ("iterations", "-i"), ("measurement_time", "-r")):
+        if key in benchmark_params:
+            options += [flag, str(benchmark_params[key])]
+    for name, values in benchmark_params.get('params', {}).items():
+        options += ["-p", f"{name}={','.join(str(value) for value in (values if isinstance(values, list) else [values]))}"]
+    # JMH profilers such as gc, perfnorm (needs perf) or stack; their results become secondary metrics
+    for profiler in benchmark_params.get('profilers', []):
+        options += ["-prof", profiler]
+    return options
+
+
+# Usable cores ordered so that hyper-threads of the same physical core are adjacent
+def ordered_cores():
+    cores = sorted(os.sched_getaffinity(0))
+    ordered = []
+    for core in cores:
+        if core in ordered:
+            continue
+        siblings_file = f"/sys/devices/system/cpu/cpu{core}/topology/thread_siblings_list"
+        siblings = [core]
+        if os.path.exists(siblings_file):
+            with open(siblings_file) as file:
+                for part in file.read().strip().split(","):
+                    first, _, last = part.partition("-")
+                    siblings += range(int(first), int(last or first) + 1)
+        ordered += [sibling for sibling in dict.fromkeys(siblings) if sibling in cores and sibling not in ordered]
+    return ordered
+
+
+# CPU package (socket) of a core
+def core_package(core):
+    package_file = f"/sys/devices/system/cpu/cpu{core}/topology/physical_package_id"
+    if not os.path.exists(package_file):
+        return 0
+    with open(package_file) as file:
+        return int(file.read().strip())
+
+
+# Split the usable cores into <concurrency> disjoint sets of <cores_per_run> cores (0 = share them out evenly).
+# RAPL counts energy per package, so concurrent runs get a package each: two runs on one package would each
+# count the other's energy. With fewer packages than runs, fewer run at a time unless benchmark.share_packages
+# accepts shared energy numbers.
+def partition_cores(concurrency, cores_per_run=0):
+    cores = ordered_cores()
+    if concurrency > 1:
+        packages = {}
+        for core in cores:
+            packages.setdefault(core_package(core), []).append(core)
+        if len(packages) >= concurrency:
+            return [package_cores[:min(cores_per_run or len(package_cores), len(package_cores))]
+                    for package_cores in list(packages.values())[:concurrency]]
+        if not params.get('benchmark', {}).get('share_packages', False):
+            print(f"6.1 Only {len(packages)} CPU package(s) for {concurrency} concurrent benchmarks, whose energy "
+                  f"would include each other's: running {len(packages)} at a time (see benchmark.share_packages).")
+            return partition_cores(len(packages), cores_per_run)
+        print(f"6.1 Warning: {concurrency} concurrent benchmarks share {len(packages)} CPU package(s); "
+              f"their energy numbers include each other's.")
+
+    size = cores_per_run or len(cores) // max(1, concurrency)
+    if size < 1 or size * concurrency > len(cores):
+        size = max(1, min(size, len(cores)))
+        concurrency = max(1, len(cores) // size)
+        print(f"6.1 Not enough cores: running {concurrency} benchmarks at a time on {size} cores each.")
+    return [cores[i * size:(i + 1) * size] for i in range(concurrency)]
+
+
+# Run the JMH harness for one commit JAR pinned to <cores>; return True on success.
+# With <fork> set, only that fork is run and its files go to the rounds directories.
+# <run_files> = (JAR path, JMH output, JSON result, run info, energy directory) overrides both.
+def benchmark_jar(jar_file2, cores, jmh_args=(), fork=None, run_files=None):
+    # Extract the first 8 characters of the JAR name
+    jar_name_prefix = jar_file2[:8]
+    jar_path = os.path.join(COMMIT_JARS, jar_file2)
+    core_list = ",".join(str(core) for core in cores)
+
+    if run_files is not None:
+        jar_path, output_file, result_file, run_info_file, energy_dir = run_files
+        print(f"6.3 Processing JAR: {jar_file2} (prefix: {jar_name_prefix}) for "
+              f"{os.path.relpath(os.path.dirname(result_file), RESULTS_PATH)} on cores {core_list}")
+    elif fork is None:
+        print(f"6.3 Processing JAR: {jar_file2} (prefix: {jar_name_prefix}) on cores {core_list}")
+        output_file = os.path.join(JMH_RESULTS, f"{jar_name_prefix}-jmh-output.txt")
+        result_file = os.path.join(PERF_DATA, f"{jar_name_prefix}-perf-data.json")
+        run_info_file = os.path.join(RUN_INFO, f"{jar_name_prefix}.json")
+        energy_dir = os.path.join(ENERGY_DATA, jar_name_prefix)
+    else:
+        print(f"6.3 Processing JAR: {jar_file2} (prefix: {jar_name_prefix}) fork {fork} on cores {core_list}")
+        output_file, result_file, run_info_file = fork_files(jar_name_prefix, fork)
+        energy_dir = os.path.join(ENERGY_DATA, jar_name_prefix, f"fork{fork}")
+
+    # The forked JVMs write their energy samples to <energy_dir> (see EnergyState.java). With the
+    # energy sampler running, SampledApp runs instead of App, without RAPL reads or any other fixture
+    # around the invocations (see IterationEnergyState.java). A run confined to one of several
+    # packages measures only that package, which concurrent runs on other packages do not touch.
+    shutil.rmtree(energy_dir, ignore_errors=True)
+    os.makedirs(energy_dir)
+    run_packages = {core_package(core) for core in cores}
+    package = run_packages.pop() if len(run_packages) == 1 and \
+        len({core_package(core) for core in ordered_cores()}) > 1 else None
+    sampler = start_energy_sampler(energy_dir, package)
+    jvm_args = [f"-Denergy.dir={energy_dir}", f"-Denergy.root={params.get('energy', {}).get('root', RAPL_ROOT)}"]
+    if package is not None:
+        jvm_args.append(f"-Denergy.package={package}")
+    benchmarks = r"com\.example\.SampledApp\." if sampler else r"com\.example\.App\."
+    jmh_args = list(jmh_args) + [benchmarks, "-jvmArgsAppend", " ".join(jvm_args)]
+
+    # Run the benchmark JAR and capture its output; forked JVMs inherit the CPU affinity
+    started = datetime.now().isoformat(timespec="seconds")
+    try:
+        with open(output_file, "w") as output:
+            result = subprocess.run(
+                ["taskset", "--cpu-list", core_list] + jmh_command(jar_path, result_file, jmh_args),
+                cwd=JMH_PATH,
+                stdout=output,
+                stderr=subprocess.PIPE
+            )
+    finally:
+        if sampler:
+            stop_energy_sampler(sampler, energy_dir, result_file)
+    print(f"6.6 Saved benchmark output to {os.path.abspath(output_file)}")
+
+    # Record where and when the run happened next to its results
+    with open(run_info_file, "w") as file:
+        json.dump({"jar": jar_file2, "cores": list(cores), "package": package, "started": started,
+                   "returncode": result.returncode}, file, indent=2)
+    return result.returncode == 0
+
+
+# JMH output, JSON result and run info of one fork of a commit in the rounds directories
+def fork_files(jar_name_prefix, fork):
+    return (os.path.join(JMH_ROUNDS, f"{jar_name_prefix}-fork{fork}-jmh-output.txt"),
+            os.path.join(PERF_ROUNDS, f"{jar_name_prefix}-fork{fork}-perf-data.json"),
+            os.path.join(PERF_ROUNDS, f"{jar_name_prefix}-fork{fork}-run-info.json"))
+
+
+# Order in which the commits run one round of forks: always the same ("interleaved") or
+# shuffled again every round ("random"), so that drift of the machine is spread over all commits
+def fork_round(jar_files2, order, rng):
+    round_jars = sorted(jar_files2)
+    if order == "random":
+        rng.shuffle(round_jars)
+    return round_jars
+
+
+# Regularized incomplete beta function I_x(a, b), continued fraction evaluated with Lentz's method
+def incomplete_beta(x, a, b):
+    if x <= 0 or x >= 1:
+        return max(0.0, min(1.0, x))
+    if x > (a + 1) / (a + b + 2):
+        return 1 - incomplete_beta(1 - x, b, a)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x)) / a
+    c, d = 1.0, 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+    fraction = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+            c = 1 + numerator / c
+            c = c if abs(c) > 1e-300 else 1e-300
+            fraction *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return front * fraction
+
+
+# Two-sided Student t quantile, e.g. t_quantile(0.9995, df) for JMH's 99.9% confidence interval
+def t_quantile(p, df):
+    def cdf(t):
+        tail = 0.5 * incomplete_beta(df / (df + t * t), df / 2, 0.5)
+        return 1 - tail if t >= 0 else tail
+
+    low, high = -1e3, 1e3
+    for _ in range(200):
+        middle = (low + high) / 2
+        if cdf(middle) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+# Recompute score, error, confidence and percentiles of a JMH metric from its raw data
+def summarise_metric(metric):
+    if metric.get("rawDataHistogram"):
+        pairs = [pair for fork in metric["rawDataHistogram"] for iteration in fork for pair in iteration]
+        values = np.array([value for value, _ in pairs], dtype=float)
+        weights = np.array([count for _, count in pairs], dtype=float)
+    else:
+        values = np.array([value for fork in metric.get("rawData", []) for value in fork], dtype=float)
+        weights = np.ones(len(values))
+    n = weights.sum()
+    if n == 0:
+        return
+
+    score = float(np.average(values, weights=weights))
+    error = float("nan")
+    if n > 2:
+        variance = float(np.sum(weights * (values - score) ** 2) / (n - 1))
+        error = t_quantile(0.9995, n - 1) * math.sqrt(variance / n)
+    metric["score"] = score
+    metric["scoreError"] = error
+    metric["scoreConfidence"] = [score - error, score + error]
+
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    metric["scorePercentiles"] = {
+        key: float(values[order][min(len(values) - 1, np.searchsorted(cumulative, float(key) / 100 * n))])
+        for key in metric.get("scorePercentiles", {})
+    }
+
+
+# Copy of a JMH metric without its raw data, to merge the raw data of all forks into
+def empty_metric(metric):
+    return {key: value for key, value in metric.items() if key not in ("rawData", "rawDataHistogram")}
+
+
+# Add the raw data of the same metric from another fork to <metric>
+def merge_metric(metric, fork_metric):
+    metric["rawData"] = metric.get("rawData", []) + fork_metric.get("rawData", [])
+    if "rawDataHistogram" in metric or "rawDataHistogram" in fork_metric:
+        metric["rawDataHistogram"] = metric.get("rawDataHistogram", []) + fork_metric.get("rawDataHistogram", [])
+
+
+# Reassemble the per-fork JMH results of one commit into a single JMH result file
+def merge_fork_results(fork_result_files, result_file):
+    merged = {}
+    for fork_result_file in fork_result_files:
+        with open(fork_result_file, "r") as file:
+            for entry in json.load(file):
+                key = (entry.get("benchmark"), entry.get("mode"), json.dumps(entry.get("params", {}), sort_keys=True))
+                if key not in merged:
+                    merged[key] = dict(entry, forks=0, primaryMetric=empty_metric(entry["primaryMetric"]),
+                                       secondaryMetrics={})
+                merge_metric(merged[key]["primaryMetric"], entry["primaryMetric"])
+                # Profiler results (gc, perfnorm, ...) are merged the same way
+                for name, fork_metric in entry.get("secondaryMetrics", {}).items():
+                    secondary = merged[key]["secondaryMetrics"].setdefault(name, empty_metric(fork_metric))
+                    merge_metric(secondary, fork_metric)
+                merged[key]["forks"] += entry.get("forks", 1)
+
+    for entry in merged.values():
+        summarise_metric(entry["primaryMetric"])
+        for metric in entry["secondaryMetrics"].values():
+            summarise_metric(metric)
+    with open(result_file, "w") as file:
+        json.dump(list(merged.values()), file, indent=4)
+    return list(merged.values())
+
+
+# Put the forks of one commit back together as if they had been run in one JMH invocation
+def reassemble_forks(jar_file2, forks):
+    jar_name_prefix = jar_file2[:8]
+    files = [fork_files(jar_name_prefix, fork) for fork in range(1, forks + 1)]
+
+    entries = merge_fork_results([result_file for _, result_file, _ in files],
+                                 os.path.join(PERF_DATA, f"{jar_name_prefix}-perf-data.json"))
+    with open(os.path.join(JMH_RESULTS, f"{jar_name_prefix}-jmh-output.txt"), "w") as output:
+        for output_file, _, _ in files:
+            with open(output_file, "r") as fork_output:
+                output.write(fork_output.read())
+
+    runs = []
+    for _, _, run_info_file in files:
+        with open(run_info_file, "r") as file:
+            runs.append(json.load(file))
+    with open(os.path.join(RUN_INFO, f"{jar_name_prefix}.json"), "w") as file:
+        json.dump({"jar": jar_file2, "cores": sorted({core for run in runs for core in run["cores"]}),
+                   "forks": runs, "returncode": 0}, file, indent=2)
+
+    # Drop energy samples of forks beyond <forks> left over from an earlier run
+    energy_dir = os.path.join(ENERGY_DATA, jar_name_prefix)
+    for name in os.listdir(energy_dir) if os.path.isdir(energy_dir) else []:
+        if name not in {f"fork{fork}" for fork in range(1, forks + 1)}:
+            path = os.path.join(energy_dir, name)
+            shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+    return entries
+
+
+# Largest scoreError relative to its score over all benchmarks and modes of a JMH result
+def relative_error(entries):
+    errors = []
+    for entry in entries:
+        score = entry["primaryMetric"].get("score")
+        error = entry["primaryMetric"].get("scoreError")
+        if not isinstance(error, (int, float)) or math.isnan(error) or not score:
+            return math.inf
+        errors.append(abs(error / score))
+    return max(errors, default=math.inf)
+
+
+def process_jars(checkpoint=None):
     # Get the list of JAR files in Commit-jars directory
-    jar_files2 = [
-        f for f in os.listdir(COMMIT_JARS)
-        if f.endswith(".jar") and "javadoc" not in f.lower()
-    ]
+    # Only the JARs of the build manifest: anything else in COMMIT_JARS is stale or not a series commit
+    with open(JARS_MANIFEST, mode="r") as file:
+        jar_files2 = [
+            row["Jar"] for row in csv.DictReader(file)
+            if "javadoc" not in row["Jar"].lower() and os.path.exists(os.path.join(COMMIT_JARS, row["Jar"]))
+        ]
 
     print(f"6.1 Found {len(jar_files2)} JAR files to process (excluding 'javadoc' jars).")
 
@@ -439,79 +1537,483 @@ def process_jars():
         print("6.2 No valid JAR files found to process.")
         return
 
+    benchmark_params = params.get('benchmark', {})
+    forks = benchmark_params.get('forks', 5)
+    order = benchmark_params.get('order', 'sequential')
+    if order not in ("sequential", "interleaved", "random"):
+        print(f"6.2 Unknown benchmark order '{order}', using 'sequential'.")
+        order = "sequential"
+
+    options = jmh_options(benchmark_params)
+
+    # Adaptive mode adds forks to a commit until its relative scoreError is below the threshold
+    adaptive = benchmark_params.get('adaptive', {})
+    if adaptive.get('enabled', False):
+        min_forks = adaptive.get('min_forks', 2)
+        max_forks = max(min_forks, adaptive.get('max_forks', 10))
+        threshold = adaptive.get('threshold', 0.02)
+    else:
+        min_forks = max_forks = forks
+        threshold = None
+
+    # Skip JARs that an earlier, interrupted run already benchmarked
+    pending = []
     for jar_file2 in jar_files2:
+        jar_inputs = hash_inputs([os.path.join(COMMIT_JARS, jar_file2), BENCHMARK_JAR, options, forks, order, adaptive,
+                                  params.get('energy', {})])
+        if checkpoint is not None and commit_result(checkpoint, "benchmark", jar_file2[:8], jar_inputs):
+            print(f"6.3 Skipping JAR: {jar_file2} (already benchmarked)")
+        else:
+            pending.append((jar_file2, jar_inputs))
+
+    # Every concurrent benchmark JVM owns a disjoint set of cores for its whole run
+    core_sets = queue.Queue()
+    for cores in partition_cores(benchmark_params.get('concurrency', 1), benchmark_params.get('cores_per_run', 0)):
+        core_sets.put(cores)
+
+    def run_pinned(jar_file2, fork):
+        cores = core_sets.get()
         try:
-            # Extract the first 8 characters of the JAR name
-            jar_name_prefix = jar_file2[:8]
-            jar_path = os.path.join(COMMIT_JARS, jar_file2)
-
-            print(f"\n6.3 Processing JAR: {jar_file2} (prefix: {jar_name_prefix})")
-
-            # Install the JAR with Maven
-            subprocess.run(MAVEN_INSTALL_CMD + [f"-Dfile={jar_path}"], check=True)
-            print(f"6.4 Installed {jar_file2} successfully.")
+            jmh_args = options + ["-f", str(forks if fork is None else 1)]
+            return benchmark_jar(jar_file2, cores, jmh_args, fork)
+        finally:
+            core_sets.put(cores)
+
+    # Run jobs of (JAR, fork) on the pinned cores and return the JARs that had a failing job
+    def run_jobs(executor, jobs):
+        failed = set()
+        futures = {executor.submit(run_pinned, jar_file2, fork): (jar_file2, fork) for jar_file2, fork in jobs}
+        for future in as_completed(futures):
+            jar_file2, fork = futures[future]
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                print(f"Unexpected error for {os.path.abspath(jar_file2)}: {e}")
+                succeeded = False
+            if not succeeded:
+                failed.add(jar_file2)
+            elif checkpoint is not None and fork is not None:
+                mark_commit_done(checkpoint, "benchmark_forks", f"{jar_file2[:8]}-fork{fork}",
+                                 hash_inputs([os.path.join(COMMIT_JARS, jar_file2), BENCHMARK_JAR, options, params.get('energy', {})]), True)
+        return failed
+
+    # Run rounds of one fork per active commit. Forks that already ran in an interrupted run are
+    # not repeated, and a commit leaves the rounds once it fails or its results are precise enough.
+    def run_rounds(executor, jar_files3):
+        rng = random.Random(benchmark_params.get('seed'))
+        active, done, failed = list(jar_files3), {}, set()
+        for fork in range(1, max_forks + 1):
+            if not active:
+                break
+            jobs = []
+            for jar_file2 in fork_round(active, order, rng):
+                fork_inputs = hash_inputs([os.path.join(COMMIT_JARS, jar_file2), BENCHMARK_JAR, options, params.get('energy', {})])
+                if checkpoint is None or not commit_result(checkpoint, "benchmark_forks",
+                                                           f"{jar_file2[:8]}-fork{fork}", fork_inputs):
+                    jobs.append((jar_file2, fork))
+            print(f"6.2 Round {fork}: {len(jobs)} of {len(active)} commits to run.")
+            failed |= run_jobs(executor, jobs)
+
+            for jar_file2 in list(active):
+                if jar_file2 in failed:
+                    active.remove(jar_file2)
+                elif fork >= min_forks:
+                    try:
+                        error = relative_error(reassemble_forks(jar_file2, fork))
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"6.7 Could not reassemble the forks of {jar_file2}: {e}")
+                        failed.add(jar_file2)
+                        active.remove(jar_file2)
+                        continue
+                    if fork == max_forks or (threshold is not None and error < threshold):
+                        print(f"6.7 Reassembled {fork} forks of {jar_file2} (relative error {error:.2%})")
+                        done[jar_file2] = fork
+                        active.remove(jar_file2)
+        return done
+
+    # Sequential non-adaptive runs all forks of a commit in one JMH invocation. Otherwise every fork
+    # is its own invocation: commit by commit when sequential, round by round across commits if not.
+    pending.sort()
+    with ThreadPoolExecutor(max_workers=core_sets.qsize()) as executor:
+        if order == "sequential" and threshold is None:
+            failed = run_jobs(executor, [(jar_file2, None) for jar_file2, _ in pending])
+            done = {jar_file2: forks for jar_file2, _ in pending if jar_file2 not in failed}
+        elif order == "sequential":
+            done = {}
+            for jar_file2, _ in pending:
+                done.update(run_rounds(executor, [jar_file2]))
+        else:
+            done = run_rounds(executor, [jar_file2 for jar_file2, _ in pending])
+
+    for jar_file2, jar_inputs in pending:
+        if jar_file2 in done and checkpoint is not None:
+            mark_commit_done(checkpoint, "benchmark", jar_file2[:8], jar_inputs, done[jar_file2])
+
+    # The stage must not be marked complete while a commit is missing, or it would never be retried
+    unfinished = [jar_file2 for jar_file2, _ in pending if jar_file2 not in done]
+    if unfinished:
+        print(f"\n{len(unfinished)} JARs failed to benchmark: {' '.join(sorted(unfinished))}")
+        return False
+    print("\nProcessing completed.")
 
-            # Build the Uber JAR for JMH_test
-            os.chdir(JMH_PATH)
-            subprocess.run(["mvn", "clean", "package"], check=True)
-            print("6.5 Created Uber JAR: JMH-Benchmark-MWK.jar")
 
-            # Path to the JMH benchmark JAR
-            benchmark_jar_path = os.path.join(JMH_PATH, "target", "JMH-Benchmark-MWK.jar")
+###################################### Parent-relative benchmarking ######################################
+# With benchmark.parents.enabled, every benchmarked commit is also measured against its first
+# parent: both JARs run back to back on the same cores, one fork each, for a number of rounds,
+# and the per-round ratios give paired deltas that machine drift between far-apart runs cannot bias
 
-            if not os.path.exists(benchmark_jar_path):
-                print(f"6.5 Benchmark JAR not found: {benchmark_jar_path}")
+# First parent of every commit that has one
+def first_parents(commit_hashes, repo=REPO_PATH):
+    try:
+        output = subprocess.run(["git", "rev-list", "--no-walk", "--parents", "--stdin"], cwd=repo,
+                                input="\n".join(commit_hashes), capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Error reading the parents of the benchmarked commits: {e}")
+        return {}
+    return {fields[0]: fields[1] for fields in (line.split() for line in output.split("\n")) if len(fields) > 1}
+
+
+# Build the parents that are not benchmarked commits themselves, through the build cache, and keep
+# their JARs in PARENT_JARS so that the benchmark stage never picks them up. Returns {parent: JAR path}.
+def build_parents(parents, checkpoint):
+    build_params = params.get('build', {})
+    build_inputs = hash_inputs([build_params, BUILD_MODULE])
+    parent_jars = {}
+
+    def keep(result):
+        commit_hash, status, _, jars = result
+        for jar in jars:
+            shutil.move(os.path.join(COMMIT_JARS, jar), os.path.join(PARENT_JARS, jar))
+        if status == 'Success' and jars:
+            parent_jars[commit_hash] = os.path.join(PARENT_JARS, jars[0])
+        mark_commit_done(checkpoint, "parent_build", commit_hash, build_inputs, list(result))
+
+    pending = []
+    for parent in sorted(set(parents)):
+        result = commit_result(checkpoint, "parent_build", parent, build_inputs)
+        if result is not None and all(os.path.exists(os.path.join(PARENT_JARS, jar)) for jar in result[3]):
+            if result[1] == 'Success' and result[3]:
+                parent_jars[parent] = os.path.join(PARENT_JARS, result[3][0])
+        else:
+            pending.append(parent)
+    print(f"6.8 Building {len(pending)} parent commits ({len(parents) - len(pending)} already built)...")
+    run_build_farm(pending, build_params.get('workers') or os.cpu_count() or 1, build_params.get('cache', True),
+                   on_result=keep)
+    return parent_jars
+
+
+# JMH output, JSON result, run info and energy directory of a run kept in its own directory
+def run_dir_files(run_dir):
+    return (os.path.join(run_dir, "jmh-output.txt"), os.path.join(run_dir, "perf-data.json"),
+            os.path.join(run_dir, "run-info.json"), os.path.join(run_dir, "energy"))
+
+
+# Run files of one side ("commit" or "parent") of a round of a parent-relative pair
+def parent_run_files(commit_prefix, round_number, side):
+    return run_dir_files(os.path.join(PARENT_RUNS, commit_prefix, f"round{round_number}-{side}"))
+
+
+# Scores of the selected mode and energy per invocation of one run, keyed by (metric, benchmark, params)
+def parent_run_values(commit_prefix, round_number, side):
+    _, result_file, _, _ = parent_run_files(commit_prefix, round_number, side)
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    values = {}
+    with open(result_file, "r") as file:
+        for entry in json.load(file):
+            if entry.get("mode") == score_mode:
+                key = ("time", entry["benchmark"].rsplit(".", 1)[-1], json.dumps(entry.get("params", {}), sort_keys=True))
+                values[key] = entry["primaryMetric"]["score"]
+
+    totals = {}
+    for record in sidecar_records(f"round{round_number}-{side}", root=os.path.join(PARENT_RUNS, commit_prefix)):
+        if record["phase"] == "measurement":
+            key = ("energy", record["benchmark"].rsplit(".", 1)[-1], json.dumps(record["params"], sort_keys=True))
+            total = totals.setdefault(key, [0, 0])
+            for i, value in enumerate(record_energy(record)):
+                total[i] += value
+    values.update({key: energy / invocations for key, (energy, invocations) in totals.items() if invocations})
+    return values
+
+
+# Paired deltas of every (commit, parent) over its rounds: mean of the per-round relative changes
+# with a Student t confidence interval and paired t-test p-value
+def paired_deltas(pairs, rounds, alpha=0.05):
+    rows = []
+    for commit_hash, parent in pairs:
+        ratios = {}
+        for round_number in range(1, rounds + 1):
+            try:
+                commit_values = parent_run_values(commit_hash[:8], round_number, "commit")
+                parent_values = parent_run_values(commit_hash[:8], round_number, "parent")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"6.9 Skipping round {round_number} of {commit_hash[:8]}: {e}")
                 continue
-
-            # Run the benchmark JAR and capture its output
-            output_file = os.path.join(JMH_RESULTS, f"{jar_name_prefix}-jmh-output.txt")
-            with open(output_file, "w") as output:
-                # subprocess.run(["java", "--add-opens", "java.base/java.util=ALL-UNNAMED", "-jar", benchmark_jar_path, "org.openjdk.jmh.Main", "-rff", "results.json", "-rf", "json"], cwd=JMH_DIR, stdout=output, stderr=subprocess.PIPE)
-                # subprocess.run(
-                #     ["java", "--add-opens", "java.base/java.util=ALL-UNNAMED", "-cp",
-                #      benchmark_jar_path,
-                #      "org.openjdk.jmh.Main", "-rff", f"{PERF_DATA}/{jar_name_prefix}-perf-data.json", "-rf", "json"
-                #      ],
-                #     cwd=JMH_PATH,
-                #     stdout=output,
-                #     stderr=subprocess.PIPE)
-                subprocess.run(
-                    ["java", 
-                    "--add-opens", "java.base/java.util=ALL-UNNAMED", 
-                    "--add-opens", "java.base/java.lang.reflect=ALL-UNNAMED",
-                    "--add-opens", "java.base/java.text=ALL-UNNAMED",
-                    "--add-opens", "java.desktop/java.awt.font=ALL-UNNAMED",
-                    "-cp", benchmark_jar_path, 
-                    "org.openjdk.jmh.Main", 
-                    "-rff", f"{PERF_DATA}/{jar_name_prefix}-perf-data.json", 
-                    "-rf", "json"
-                    ],
-                    cwd=JMH_PATH,
-                    stdout=output,
-                    stderr=subprocess.PIPE
-                )
-                
-                print(f"6.6 Saved benchmark output to {os.path.abspath(output_file)}")
-
-                # Rename and move the generated res.csv file
-                # result_csv = os.path.join(RESULTS_OUTPUT, "result.csv")
-                # if os.path.exists(result_csv):
-                #     summary_csv = os.path.join(JMH_RESULTS, f"{jar_name_prefix}-summary.csv")
-                #     shutil.move(result_csv, summary_csv)
-                #     print(f"6.7 Saved CSV to {summary_csv}")
-                # else:
-                #     print(f"6.7 No result.csv file found for JAR: {jar_file2}")
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error processing {os.path.abspath(jar_file2)}: {e}")
-        except Exception as e:
-            print(f"Unexpected error for {os.path.abspath(jar_file2)}: {e}")
-
-    print("\nProcessing completed.")
-
-
-if __name__ == "__main__":
-    process_jars()
+            for key, value in commit_values.items():
+                if parent_values.get(key):
+                    ratios.setdefault(key, []).append(value / parent_values[key] - 1)
+
+        for (metric, benchmark, benchmark_params), deltas in sorted(ratios.items()):
+            deltas = np.array(deltas)
+            mean = float(deltas.mean())
+            low = high = p_value = float("nan")
+            if len(deltas) > 1:
+                df = len(deltas) - 1
+                se = float(deltas.std(ddof=1)) / math.sqrt(len(deltas))
+                half_width = t_quantile(1 - alpha / 2, df) * se
+                low, high = mean - half_width, mean + half_width
+                t = mean / se if se > 0 else (math.inf if mean else 0.0)
+                p_value = incomplete_beta(df / (df + t * t), df / 2, 0.5) if math.isfinite(t) else 0.0
+            rows.append([commit_hash[:8], parent[:8], metric, benchmark, benchmark_params, len(deltas),
+                         mean, low, high, p_value])
+    return rows
+
+
+# Build the first parent of every benchmarked commit and run each (commit, parent) pair back to back,
+# alternating which side goes first, for benchmark.parents.rounds rounds; export <parent-deltas.csv>
+def benchmark_parents(checkpoint):
+    benchmark_params = params.get('benchmark', {})
+    parents_params = benchmark_params.get('parents', {})
+    if not parents_params.get('enabled', False):
+        print("6.8 Parent-relative benchmarking is disabled (benchmark.parents.enabled).")
+        return
+    rounds = parents_params.get('rounds', benchmark_params.get('forks', 5))
+
+    # Benchmarked commits and their JARs; a parent that was benchmarked itself reuses its JAR
+    manifest = pd.read_csv(JARS_MANIFEST)
+    commit_jars = {row.Commit: os.path.join(COMMIT_JARS, row.Jar) for row in manifest.itertuples()}
+    parents = first_parents(list(commit_jars))
+    jars = dict(commit_jars)
+    jars.update(build_parents([parent for parent in parents.values() if parent not in commit_jars], checkpoint))
+    pairs = sorted((commit_hash, parent) for commit_hash, parent in parents.items() if parent in jars)
+    print(f"6.8 {len(pairs)} of {len(commit_jars)} benchmarked commits have a built first parent.")
+
+    options = jmh_options(benchmark_params) + ["-f", "1"]
+    core_sets = queue.Queue()
+    for cores in partition_cores(benchmark_params.get('concurrency', 1), benchmark_params.get('cores_per_run', 0)):
+        core_sets.put(cores)
+
+    # One round of a pair on one set of cores: odd rounds run the commit first, even rounds the parent
+    def run_round(commit_hash, parent, round_number):
+        sides = [("commit", commit_hash), ("parent", parent)]
+        cores = core_sets.get()
+        try:
+            for side, side_hash in sides if round_number % 2 else sides[::-1]:
+                run_files = parent_run_files(commit_hash[:8], round_number, side)
+                os.makedirs(os.path.dirname(run_files[0]), exist_ok=True)
+                if not benchmark_jar(os.path.basename(jars[side_hash]), cores, options,
+                                     run_files=(jars[side_hash],) + run_files):
+                    return False
+            return True
+        finally:
+            core_sets.put(cores)
+
+    # Rounds go one after the other across all pairs, like the interleaved benchmark order
+    jobs = []
+    for round_number in range(1, rounds + 1):
+        for commit_hash, parent in pairs:
+            round_inputs = hash_inputs([jars[commit_hash], jars[parent], BENCHMARK_JAR, options, params.get('energy', {})])
+            if not commit_result(checkpoint, "parent_rounds", f"{commit_hash[:8]}-round{round_number}", round_inputs):
+                jobs.append((commit_hash, parent, round_number, round_inputs))
+    print(f"6.8 Running {len(jobs)} rounds of {len(pairs)} commit/parent pairs...")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=core_sets.qsize()) as executor:
+        futures = {executor.submit(run_round, *job[:3]): job for job in jobs}
+        for future in as_completed(futures):
+            commit_hash, parent, round_number, round_inputs = futures[future]
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                print(f"Unexpected error for {commit_hash[:8]} round {round_number}: {e}")
+                succeeded = False
+            if succeeded:
+                mark_commit_done(checkpoint, "parent_rounds", f"{commit_hash[:8]}-round{round_number}", round_inputs, True)
+            else:
+                failed += 1
+
+    rows = paired_deltas(pairs, rounds, params.get('analysis', {}).get('alpha', 0.05))
+    with open(RESULTS_PATH + "/parent-deltas.csv", mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Commit_Hash", "Parent_Hash", "Metric", "Benchmark", "Params", "Rounds",
+                         "Mean_Delta", "CI_Low", "CI_High", "P_Value"])
+        writer.writerows(rows)
+    print(f"6.9 Paired deltas of {len(pairs)} commits written to 'parent-deltas.csv'.")
+    # Failed rounds are run again on the next run instead of the stage being marked complete
+    if failed:
+        print(f"6.9 {failed} rounds failed; rerun autoflow.py to repeat them.")
+        return False
+
+
+###################################### Bisection ######################################
+# `autoflow.py bisect <good> <bad>` localizes the first commit between two benchmarked commits whose
+# change against <good> is significant: it builds and benchmarks midpoints of the first-parent
+# history in between, reusing the JARs of the pipeline and the build cache
+
+# JAR of a commit: one the pipeline already built, or a build through the build cache kept in BISECT_JARS
+def bisect_jar(commit_hash, counts):
+    for directory in (COMMIT_JARS, PARENT_JARS, BISECT_JARS):
+        jars = sorted(glob.glob(os.path.join(directory, f"{commit_hash[:8]}-*.jar")))
+        if jars:
+            return jars[0]
+
+    build_params = params.get('build', {})
+    use_cache = build_params.get('cache', True)
+    cache_key = build_cache_key(commit_hash) if use_cache else None
+    if not cache_hit(cache_key):
+        counts["builds"] += 1
+    (_, status, error_cause, jars), = run_build_farm([commit_hash], 1, use_cache)
+    for jar in jars:
+        shutil.move(os.path.join(COMMIT_JARS, jar), os.path.join(BISECT_JARS, jar))
+    if status != 'Success' or not jars:
+        print(f"Bisect: build of {commit_hash[:8]} failed: {error_cause}")
+        return None
+    return os.path.join(BISECT_JARS, jars[0])
+
+
+# Per-fork observations of one run, keyed by (metric, benchmark): the mean execution time of every
+# fork and the energy per invocation of every forked JVM, for the selected mode and first @Param combination
+def run_observations(result_file, energy_dir):
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    with open(result_file, "r") as file:
+        entries = [entry for entry in json.load(file) if entry.get("mode") == score_mode]
+    observations = {}
+    for entry in entries:
+        if entry.get("params") != entries[0].get("params"):
+            continue
+        metric = entry["primaryMetric"]
+        if metric.get("rawDataHistogram"):
+            forks = [[pair for iteration in fork for pair in iteration] for fork in metric["rawDataHistogram"]]
+            means = [sum(value * count for value, count in fork) / sum(count for _, count in fork) for fork in forks]
+        else:
+            means = [sum(fork) / len(fork) for fork in metric.get("rawData", []) if fork]
+        observations[("time", entry["benchmark"].rsplit(".", 1)[-1])] = np.array(means)
+
+    totals = {}
+    reference = json.dumps(entries[0].get("params", {}), sort_keys=True) if entries else None
+    records = sidecar_records(os.path.basename(energy_dir), root=os.path.dirname(energy_dir))
+    for record in reference_records(records, reference):
+        total = totals.setdefault((record["benchmark"].rsplit(".", 1)[-1], record.get("pid")), [0, 0])
+        for i, value in enumerate(record_energy(record)):
+            total[i] += value
+    for (benchmark, _), (energy, invocations) in totals.items():
+        if invocations:
+            observations.setdefault(("energy", benchmark), []).append(energy / invocations)
+    return {key: np.asarray(values, dtype=float) for key, values in observations.items()}
+
+
+# Two-sided Welch's t-test p-value of the difference between the means of two samples
+def welch_p_value(before, after):
+    # NaN (never significant) without a variance to test against: fewer than 2 observations on a
+    # side, or no spread at all
+    if len(before) < 2 or len(after) < 2:
+        return math.nan
+    errors = [np.var(sample, ddof=1) / len(sample) for sample in (before, after)]
+    if sum(errors) == 0:
+        return math.nan
+    t = (np.mean(after) - np.mean(before)) / math.sqrt(sum(errors))
+    df = sum(errors) ** 2 / sum(error ** 2 / (len(sample) - 1) for error, sample in zip(errors, (before, after)))
+    return incomplete_beta(df / (df + t * t), df / 2, 0.5)
+
+
+# Bisect the first-parent history between <good> and <bad> for the (metric, benchmark) series that
+# changed most between them, and export the steps to <bisect-<good>-<bad>.json>
+def bisect_commits(good, bad, metric="time", benchmark=None):
+    try:
+        good, bad = [subprocess.run(["git", "rev-parse", "--verify", f"{rev}^{{commit}}"], cwd=REPO_PATH,
+                                    capture_output=True, text=True, check=True).stdout.strip() for rev in (good, bad)]
+        commits = subprocess.run(["git", "rev-list", "--first-parent", "--ancestry-path", "--reverse", f"{good}..{bad}"],
+                                 cwd=REPO_PATH, capture_output=True, text=True, check=True).stdout.split()
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Bisect: cannot resolve the commits to bisect: {e}")
+        return False
+    if not commits:
+        print(f"Bisect: {bad[:8]} does not descend from {good[:8]} along first parents.")
+        return False
+    if not os.path.exists(BENCHMARK_JAR) and not build_benchmark_harness():
+        return False
+
+    benchmark_params = params.get('benchmark', {})
+    alpha = params.get('analysis', {}).get('alpha', 0.05)
+    options = jmh_options(benchmark_params) + ["-f", str(benchmark_params.get('forks', 5))]
+    cores = partition_cores(1, benchmark_params.get('cores_per_run', 0))[0]
+    run_root = os.path.join(BISECT_RUNS, f"{good[:8]}-{bad[:8]}")
+    counts = {"builds": 0, "benchmarks": 0}
+
+    # Build (if needed) and benchmark one commit; None if either fails
+    def measure(commit_hash):
+        jar_path = bisect_jar(commit_hash, counts)
+        if jar_path is None:
+            return None
+        run_files = run_dir_files(os.path.join(run_root, commit_hash[:8]))
+        os.makedirs(os.path.dirname(run_files[0]), exist_ok=True)
+        counts["benchmarks"] += 1
+        if not benchmark_jar(os.path.basename(jar_path), cores, options, run_files=(jar_path,) + run_files):
+            return None
+        return run_observations(run_files[1], run_files[3])
+
+    # Both ends are measured again so that every comparison is between runs of the same session
+    print(f"Bisect: {len(commits)} commits from {good[:8]} (good) to {bad[:8]} (bad).")
+    good_observations, bad_observations = measure(good), measure(bad)
+    if good_observations is None or bad_observations is None:
+        print("Bisect: the good and bad commits must both build and benchmark.")
+        return False
+    keys = [key for key in good_observations if key in bad_observations and key[0] == metric and
+            (benchmark is None or key[1] == benchmark) and len(good_observations[key]) and len(bad_observations[key])]
+    if not keys:
+        print(f"Bisect: no {metric} results{' for ' + benchmark if benchmark else ''} in both runs.")
+        return False
+    key = max(keys, key=lambda k: abs(np.mean(bad_observations[k]) / np.mean(good_observations[k]) - 1))
+    before, after = np.mean(good_observations[key]), np.mean(bad_observations[key])
+    p_value = welch_p_value(good_observations[key], bad_observations[key])
+    result = {"good": good, "bad": bad, "metric": metric, "benchmark": key[1], "alpha": alpha,
+              "commits": len(commits), "good_mean": before, "bad_mean": after,
+              "rel_change": after / before - 1, "p_value": p_value, "culprit": None, "candidates": [], "steps": []}
+
+    if not p_value < alpha:
+        print(f"Bisect: the change of {key[1]} {metric} ({after / before - 1:+.2%}) is not significant (p = {p_value:.3g}).")
+        if math.isnan(p_value):
+            print("Bisect: the test needs at least 2 forks with different results per commit (benchmark.forks).")
+    else:
+        # commits[low] is known good (-1 stands for <good>), commits[high] known bad; midpoints that
+        # fail to build or run are skipped like `git bisect skip`
+        low, high, skipped = -1, len(commits) - 1, set()
+        while True:
+            pending = [i for i in range(low + 1, high) if i not in skipped]
+            if not pending:
+                break
+            middle = min(pending, key=lambda i: abs(i - (low + high) / 2))
+            observations = measure(commits[middle])
+            if observations is None or not len(observations.get(key, [])):
+                skipped.add(middle)
+                result["steps"].append({"commit": commits[middle], "verdict": "skip"})
+                continue
+            mean = float(np.mean(observations[key]))
+            step_p_value = welch_p_value(good_observations[key], observations[key])
+            crossed = step_p_value < alpha and (mean - before) * (after - before) > 0
+            result["steps"].append({"commit": commits[middle], "mean": mean, "rel_change": mean / before - 1,
+                                    "p_value": step_p_value, "verdict": "bad" if crossed else "good"})
+            if crossed:
+                high = middle
+            else:
+                low = middle
+            print(f"Bisect: {commits[middle][:8]} is {'bad' if crossed else 'good'} "
+                  f"({mean / before - 1:+.2%}, p = {step_p_value:.3g}), {high - low - 1} commits left.")
+        result["culprit"] = commits[high]
+        # Skipped commits right before the culprit may be the real first bad commit
+        result["candidates"] = commits[low + 1:high + 1]
+
+    result.update(counts)
+    output_file = os.path.join(RESULTS_PATH, f"bisect-{good[:8]}-{bad[:8]}.json")
+    with open(output_file, "w") as file:
+        json.dump(result, file, indent=2)
+    if len(result["candidates"]) > 1:
+        print(f"Bisect: first commit crossing the threshold is one of "
+              f"{', '.join(commit_hash[:8] for commit_hash in result['candidates'])} (skipped commits in between).")
+    elif result["culprit"]:
+        print(f"Bisect: first commit crossing the threshold is {result['culprit'][:8]}.")
+    print(f"Bisect: {counts['builds']} builds and {counts['benchmarks']} benchmark runs; "
+          f"steps written to '{os.path.abspath(output_file)}'.")
+    return True
 
 
 ##################################### Energy computation ######################################
@@ -527,6 +2029,7 @@ def process_files_with_commit_insights(directory_path, commits_csv_path, output_
             return
 
         results = []
+        references = reference_params()
 
         # Read commits insights file into a dictionary for faster lookups
         commits_data = {}
@@ -549,36 +2052,23 @@ def process_files_with_commit_insights(directory_path, commits_csv_path, output_
                 file_hash = file_name[:8]  # Get the first 8 characters of the file name
 
                 try:
-                    with open(file_path, 'r') as file:
-                        lines = file.readlines()
-
-                    # Initialize variables for sum and count
-                    total_sum = 0
-                    count = 0
-
-                    # Define the pattern to match numbers ending with '+' and exclude " 0+"
-                    pattern = re.compile(r'(\d+)\+')
-
-                    # Process each line in the file
-                    for line in lines:
-                        line = line.strip()  # Remove leading/trailing whitespace
-
-                        # Skip lines starting with "#"
-                        if line.startswith("#"):
-                            continue
-
-                        matches = pattern.findall(line)
-                        for match in matches:
-                            # Exclude matches that are explicitly "0"
-                            if match == "0":
-                                continue
-
-                            total_sum += int(match)  # Convert to integer and add to sum
-                            count += 1
+                    # Measurement energy per benchmark of the energy sidecar files, zero readings included;
+                    # results without sidecar files fall back to the "<uj>+ " readings of the JMH output
+                    energies = sidecar_energy(file_hash)
+                    if energies is None:
+                        energies = energy_by_benchmark(file_path)
+
+                    # Only the @Param combination scored in perf-data.csv counts. The mean energy per
+                    # invocation of each benchmark is added up, like the scores of fromXML and toXML,
+                    # so that the average is the energy of one round trip and pairs with the score.
+                    reference = references.get(file_hash, next(iter(energies))[1] if energies else None)
+                    per_benchmark = [(total_sum, readings) for (_, parameters), (total_sum, readings) in energies.items()
+                                     if parameters == reference and readings]
+                    count = sum(readings for _, readings in per_benchmark)
 
                     # Calculate average if numbers were found
                     if count > 0:
-                        average = total_sum / count
+                        average = sum(total_sum / readings for total_sum, readings in per_benchmark)
                     else:
                         average = None
 
@@ -604,20 +2094,129 @@ def process_files_with_commit_insights(directory_path, commits_csv_path, output_
         print(f"Error: {str(e)}")
 
 
-# Define paths
-input_directory = os.path.join(RESULTS_PATH, "jmh-results")
-commits_csv = os.path.join(RESULTS_PATH, "commits-insights.csv")
-output_csv = os.path.join(RESULTS_PATH, "energy-data.csv")
-
-# Process files and save results
-process_files_with_commit_insights(input_directory, commits_csv, output_csv)
+# Parameters of a "# Parameters: (friends = 10, tags = 5, users = 100)" line of the JMH output
+def jmh_parameters(line):
+    pairs = line.split(":", 1)[1].strip().strip("()").split(", ")
+    return dict(pair.split(" = ", 1) for pair in pairs if " = " in pair)
+
+
+# Energy sidecar records of a commit in the order they were measured. The file names hold process
+# ids, which do not sort like the forks ran.
+def sidecar_records(commit_hash, root=ENERGY_DATA):
+    records = []
+    for path in glob.glob(os.path.join(root, commit_hash, "**", "*.jsonl"), recursive=True):
+        with open(path, 'r') as file:
+            records += [json.loads(line) for line in file if line.strip()]
+    return sorted(records, key=lambda record: record["start_ns"])
+
+
+# @Param combination (JSON, sorted keys) that perf-data.csv scores for every commit: that of its first
+# <score_mode> result in <perf-samples.npz>, or in <samples> when they are loaded already
+def reference_params(samples=None):
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    if samples is None:
+        if not os.path.exists(PERF_SAMPLES):
+            return {}
+        samples = load_perf_samples()
+    samples = samples[(samples["metric"] == "primary") & (samples["mode"] == score_mode)]
+    return samples.groupby("commit", sort=False)["params"].first().to_dict()
+
+
+# Measurement-phase sidecar records of the <reference> @Param combination (JSON, sorted keys), or of
+# the combination measured first when there is no JMH result to take it from
+def reference_records(records, reference=None):
+    records = [record for record in records if record["phase"] == "measurement"]
+    if reference is None and records:
+        reference = json.dumps(records[0]["params"], sort_keys=True)
+    return [record for record in records if json.dumps(record["params"], sort_keys=True) == reference]
+
+
+# Energy (uJ) and invocations of one sidecar iteration record: integrated from the energy sampler
+# when it ran, otherwise the per-invocation probe samples
+def record_energy(record):
+    if "sampler_uj" in record:
+        return record["sampler_uj"], record.get("ops", 0)
+    return sum(record["samples"]), len(record["samples"])
+
+
+# Measurement-phase [energy (uJ), invocations] of a commit from its sidecar files per benchmark
+# and @Param combination, first combination first; None without sidecar files
+def sidecar_energy(commit_hash):
+    records = sidecar_records(commit_hash)
+    if not records:
+        return None
+    energies = {}
+    for record in records:
+        if record["phase"] == "measurement":
+            key = (record["benchmark"], json.dumps(record["params"], sort_keys=True))
+            total = energies.setdefault(key, [0, 0])
+            for i, value in enumerate(record_energy(record)):
+                total[i] += value
+    return energies
+
+
+# [energy (uJ), readings] of a JMH output file per benchmark and @Param combination
+def energy_by_benchmark(file_path):
+    energies = {}
+    benchmark, parameters = None, {}
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("# Benchmark:"):
+                benchmark, parameters = line.split(":", 1)[1].strip(), {}
+            elif line.startswith("# Parameters:"):
+                parameters = jmh_parameters(line)
+            elif not line.startswith("#"):
+                values = [int(match) for match in re.findall(r'(\d+)\+', line) if match != "0"]
+                if values:
+                    total = energies.setdefault((benchmark, json.dumps(parameters, sort_keys=True)), [0, 0])
+                    total[0] += sum(values)
+                    total[1] += len(values)
+    return energies
+
+
+# Export the average energy per commit to <energy-data.csv>
+def export_energy_data():
+    # Define paths
+    input_directory = os.path.join(RESULTS_PATH, "jmh-results")
+    commits_csv = os.path.join(RESULTS_PATH, "commits-insights.csv")
+    output_csv = os.path.join(RESULTS_PATH, "energy-data.csv")
+
+    # Process files and save results
+    process_files_with_commit_insights(input_directory, commits_csv, output_csv)
+    export_energy_domains(os.path.join(RESULTS_PATH, "energy-domains.csv"))
+
+
+# Export the energy of every RAPL domain (package, core, uncore, dram, psys) per round trip, the
+# mean energy per invocation of each benchmark added up as in <energy-data.csv>, and commit to
+# <energy-domains.csv>, from the measurement iterations of the @Param combination of perf-data.csv
+def export_energy_domains(output_csv_path):
+    rows = []
+    references = reference_params()
+    for commit_dir in sorted(glob.glob(os.path.join(ENERGY_DATA, "*"))):
+        commit_hash = os.path.basename(commit_dir)
+        records = reference_records(sidecar_records(commit_hash), references.get(commit_hash))
+        if not records:
+            continue
+        joules, invocations = {}, {}
+        for record in records:
+            benchmark = record["benchmark"]
+            invocations[benchmark] = invocations.get(benchmark, 0) + record_energy(record)[1]
+            for domain, value in record.get("domains", {}).items():
+                per_domain = joules.setdefault(domain, {})
+                per_domain[benchmark] = per_domain.get(benchmark, 0) + value
+        for domain, per_benchmark in joules.items():
+            values = [value / invocations[benchmark] for benchmark, value in per_benchmark.items() if invocations[benchmark]]
+            if values:
+                rows.append([commit_hash, domain, f"{sum(values):.6f}"])
+
+    with open(output_csv_path, 'w', newline='') as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(["HASH", "DOMAIN", "JOULES_PER_INVOCATION"])
+        writer.writerows(rows)
+    print(f"Energy per RAPL domain saved to {output_csv_path}.")
 
 ###################################### Performance computation  ######################################
-# Define file paths
-json_dir = os.path.join(RESULTS_PATH, "perf-data")
-csv_file = os.path.join(RESULTS_PATH, "commits-insights.csv")
-output_file = os.path.join(json_dir, "perf-data.csv")
-
 
 # Function to extract the year from "Commits insights.csv"
 def get_year_mapping(csv_file):
@@ -637,79 +2236,597 @@ def get_year_mapping(csv_file):
     return hash_year_map
 
 
-# Function to process JSON files and extract scores
-def process_json_files(json_dir, hash_year_map):
+# Score of the benchmark mode selected in params.yaml per commit, from the JMH scores kept in
+# <perf-samples.npz>, combined over the benchmarks of the harness into one round trip (fromXML +
+# toXML): times add up, throughputs combine harmonically
+def process_perf_summaries(hash_year_map, store_path=PERF_SAMPLES):
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    summaries = load_perf_summaries(store_path)
+    references = reference_params(summaries)
+    primary = summaries[(summaries["metric"] == "primary") & (summaries["mode"] == score_mode)]
     results = []
-    for file_name in os.listdir(json_dir):
-        if file_name.endswith(".json"):
-            json_path = os.path.join(json_dir, file_name)
-            try:
-                with open(json_path, mode="r") as file:
-                    data = json.load(file)  # Load JSON data
-                    if isinstance(data, list):  # Check if the top-level object is a list
-                        scores = [
-                            entry["primaryMetric"]["score"]
-                            for entry in data
-                            if "primaryMetric" in entry and "score" in entry["primaryMetric"]
-                        ]
-
-                        if len(scores) > 1:
-                            second_score = scores[1]
-                            commit_hash = file_name[:8]
-                            year = hash_year_map.get(commit_hash, "Unknown")
-                            results.append((commit_hash, second_score, year))
-            except Exception as e:
-                print(f"Error processing '{os.path.abspath(json_path)}': {e}")
+    for commit_hash in summaries["commit"].unique():
+        # Only the first @Param combination; the others are in <scaling-data.csv>
+        scores = primary[(primary["commit"] == commit_hash) &
+                         (primary["params"] == references.get(commit_hash))]["score"].tolist()
+        if not scores:
+            print(f"No '{score_mode}' result for commit {commit_hash}")
+            continue
+        year = hash_year_map.get(commit_hash, "Unknown")
+        if score_mode == "thrpt":
+            score = 1 / sum(1 / score for score in scores) if all(scores) else 0.0
+        else:
+            score = sum(scores)
+        results.append((commit_hash, score, year, run_cores(commit_hash)))
     return results
 
 
+# Cores a commit's benchmark was pinned to, as recorded by benchmark_jar()
+def run_cores(commit_hash):
+    run_info_path = os.path.join(RUN_INFO, f"{commit_hash}.json")
+    if not os.path.exists(run_info_path):
+        return ""
+    with open(run_info_path, mode="r") as file:
+        return " ".join(str(core) for core in json.load(file)["cores"])
+
+
 # Write results to CSV
 def write_to_csv(results, output_file):
     try:
         with open(output_file, mode="w", newline="") as file:
             writer = csv.writer(file)
-            writer.writerow(["Commit_Hash", "Score", "Year"])
+            writer.writerow(["Commit_Hash", "Score", "Year", "Cores"])
             writer.writerows(results)
         print(f"Results written to '{os.path.abspath(output_file)}'")
     except Exception as e:
         print(f"Error writing to '{output_file}': {e}")
 
 
-# Main workflow
-if __name__ == "__main__":
+# Export the benchmark score per commit to <perf-data/perf-data.csv>
+def export_perf_data():
+    # Define file paths
+    csv_file = os.path.join(RESULTS_PATH, "commits-insights.csv")
+    output_file = os.path.join(PERF_DATA, "perf-data.csv")
+
     hash_year_map = get_year_mapping(csv_file)
-    results = process_json_files(json_dir, hash_year_map)
+    results = process_perf_summaries(hash_year_map)
     write_to_csv(results, output_file)
 
+# Columns of <perf-samples.npz>: one row per raw JMH sample. Histogram buckets of the sample mode
+# are one row with the bucket count as weight; everything else has weight 1.
+PERF_SAMPLE_COLUMNS = ["commit", "benchmark", "mode", "params", "metric", "fork", "iteration", "value", "weight"]
+
+# Columns of the result summaries in <perf-samples.npz> (keys "summary_<column>"): the score, score
+# error and unit JMH reports for every metric of a benchmark, mode and @Param combination. Profiler
+# metrics aggregate in different ways (gc.count adds up), so their score is not rebuilt from samples.
+PERF_SUMMARY_COLUMNS = ["commit", "benchmark", "mode", "params", "metric", "score", "error", "unit"]
+
+
+# Load every mode's per-fork, per-iteration raw samples of all <*-perf-data.json> files into the
+# columnar NumPy store <perf-samples.npz>; the primary metric has metric "primary", profiler
+# results their secondary metric name. The summaries of PERF_SUMMARY_COLUMNS are stored alongside, so
+# that no later stage reads the JSON files again.
+def ingest_perf_samples(json_dir=PERF_DATA, store_path=PERF_SAMPLES):
+    columns = {name: [] for name in PERF_SAMPLE_COLUMNS}
+    summaries = {name: [] for name in PERF_SUMMARY_COLUMNS}
+    for json_path in sorted(glob.glob(os.path.join(json_dir, "*-perf-data.json"))):
+        commit_hash = os.path.basename(json_path)[:8]
+        try:
+            with open(json_path, mode="r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error processing '{os.path.abspath(json_path)}': {e}")
+            continue
+
+        for entry in data:
+            parameters = json.dumps(entry.get("params", {}), sort_keys=True)
+            metrics = [("primary", entry["primaryMetric"])] + \
+                      [(name.lstrip("\u00b7"), metric) for name, metric in entry.get("secondaryMetrics", {}).items()]
+            for metric_name, metric in metrics:
+                for name, value in zip(PERF_SUMMARY_COLUMNS, [
+                        commit_hash, entry["benchmark"].rsplit(".", 1)[-1], entry.get("mode", ""), parameters,
+                        metric_name, float(metric.get("score", "NaN")), float(metric.get("scoreError", "NaN")),
+                        metric.get("scoreUnit", "")]):
+                    summaries[name].append(value)
+                if metric.get("rawDataHistogram"):
+                    samples = [(fork, iteration, value, count)
+                               for fork, iterations in enumerate(metric["rawDataHistogram"], 1)
+                               for iteration, buckets in enumerate(iterations, 1) for value, count in buckets]
+                else:
+                    samples = [(fork, iteration, value, 1)
+                               for fork, iterations in enumerate(metric.get("rawData", []), 1)
+                               for iteration, value in enumerate(iterations, 1)]
+                for fork, iteration, value, weight in samples:
+                    columns["commit"].append(commit_hash)
+                    columns["benchmark"].append(entry["benchmark"].rsplit(".", 1)[-1])
+                    columns["mode"].append(entry.get("mode", ""))
+                    columns["params"].append(parameters)
+                    columns["metric"].append(metric_name)
+                    columns["fork"].append(fork)
+                    columns["iteration"].append(iteration)
+                    columns["value"].append(value)
+                    columns["weight"].append(weight)
+
+    arrays = {name: np.array(values, dtype=str) for name, values in columns.items()
+              if name in ("commit", "benchmark", "mode", "params", "metric")}
+    arrays["fork"] = np.array(columns["fork"], dtype=np.int32)
+    arrays["iteration"] = np.array(columns["iteration"], dtype=np.int32)
+    arrays["value"] = np.array(columns["value"], dtype=np.float64)
+    arrays["weight"] = np.array(columns["weight"], dtype=np.float64)
+    for name, values in summaries.items():
+        arrays["summary_" + name] = np.array(values, dtype=np.float64 if name in ("score", "error") else str)
+    with open(store_path + ".tmp", "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(store_path + ".tmp", store_path)
+    print(f"Stored {len(arrays['value'])} raw samples of {len(set(columns['commit']))} commits in '{os.path.abspath(store_path)}'")
+
+
+# The raw samples of <perf-samples.npz> as a DataFrame with the columns of PERF_SAMPLE_COLUMNS
+def load_perf_samples(store_path=PERF_SAMPLES):
+    with np.load(store_path, allow_pickle=False) as store:
+        return pd.DataFrame({name: store[name] for name in PERF_SAMPLE_COLUMNS})
+
+
+# The result summaries of <perf-samples.npz> as a DataFrame with the columns of PERF_SUMMARY_COLUMNS
+def load_perf_summaries(store_path=PERF_SAMPLES):
+    with np.load(store_path, allow_pickle=False) as store:
+        return pd.DataFrame({name: store["summary_" + name] for name in PERF_SUMMARY_COLUMNS})
+
+
+# Export the profiler results (secondaryMetrics) of the selected mode and first @Param combination, as
+# JMH scored them, from <perf-samples.npz> to <perf-data/secondary-metrics.csv>, one row per commit,
+# benchmark and metric
+def export_secondary_metrics():
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    summaries = load_perf_summaries()
+    references = reference_params(summaries)
+    secondary = summaries[(summaries["metric"] != "primary") & (summaries["mode"] == score_mode)]
+    secondary = secondary[secondary["params"] == secondary["commit"].map(references)]
+
+    output_file = os.path.join(PERF_DATA, "secondary-metrics.csv")
+    # NaN errors (a single fork) are written as JMH writes them
+    secondary[["commit", "benchmark", "metric", "score", "error", "unit"]].to_csv(
+        output_file, index=False, header=["Commit_Hash", "Benchmark", "Metric", "Score", "Score_Error", "Unit"],
+        na_rep="NaN")
+    print(f"Secondary metrics written to '{os.path.abspath(output_file)}'")
+
+###################################### Scaling with the input size ######################################
+
+# Score and energy of every synthetic input size a commit was benchmarked with, to <scaling-data.csv>
+def scaling_rows():
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    summaries = load_perf_summaries()
+    primary = summaries[(summaries["metric"] == "primary") & (summaries["mode"] == score_mode)]
+    rows = []
+    commit_energies = {}
+    for commit_hash, benchmark, parameters, score in primary[["commit", "benchmark", "params", "score"]].itertuples(index=False):
+        sizes = json.loads(parameters)
+        if int(sizes.get("users", 0)) <= 0:
+            continue
+        if commit_hash not in commit_energies:
+            output_file = os.path.join(JMH_RESULTS, f"{commit_hash}-jmh-output.txt")
+            energies = sidecar_energy(commit_hash)
+            if energies is None:
+                energies = energy_by_benchmark(output_file) if os.path.exists(output_file) else {}
+            # Keyed by method name, like the benchmarks of the store
+            commit_energies[commit_hash] = {(name.rsplit(".", 1)[-1], combination): energy
+                                            for (name, combination), energy in energies.items()}
+        users, friends, tags = (int(sizes.get(name, 0)) for name in ("users", "friends", "tags"))
+        energy = commit_energies[commit_hash].get((benchmark, parameters))
+        rows.append({
+            "Commit_Hash": commit_hash,
+            "Benchmark": benchmark,
+            "Users": users,
+            "Friends": friends,
+            "Tags": tags,
+            # Elements of the document: every user with its friends and tags
+            "Elements": users * (1 + friends + tags),
+            "Score": score,
+            "Energy_Avg_(uj)": energy[0] / energy[1] if energy and energy[1] else "",
+        })
+    return rows
+
+
+# Slope of log(y) over log(Elements), i.e. the exponent k of y ~ Elements^k
+def loglog_slope(elements, values):
+    points = [(x, y) for x, y in zip(elements, values) if x > 0 and y != "" and float(y) > 0]
+    if len({x for x, _ in points}) < 2:
+        return ""
+    x, y = np.log([x for x, _ in points]), np.log([float(y) for _, y in points])
+    return round(float(np.polyfit(x, y, 1)[0]), 4)
+
+
+# Export the scaling curves to <scaling-data.csv> and one fitted slope per commit and benchmark
+# to <scaling-slopes.csv>
+def export_scaling_data():
+    rows = scaling_rows()
+    data_file = os.path.join(RESULTS_PATH, "scaling-data.csv")
+    slopes_file = os.path.join(RESULTS_PATH, "scaling-slopes.csv")
+    columns = ["Commit_Hash", "Benchmark", "Users", "Friends", "Tags", "Elements", "Score", "Energy_Avg_(uj)"]
+    pd.DataFrame(rows, columns=columns).to_csv(data_file, index=False)
+
+    slopes = []
+    for (commit_hash, benchmark), group in pd.DataFrame(rows, columns=columns).groupby(["Commit_Hash", "Benchmark"], sort=False):
+        slopes.append([commit_hash, benchmark, group["Elements"].nunique(),
+                       loglog_slope(group["Elements"], group["Score"]),
+                       loglog_slope(group["Elements"], group["Energy_Avg_(uj)"])])
+    pd.DataFrame(slopes, columns=["Commit_Hash", "Benchmark", "Sizes", "Time_Slope", "Energy_Slope"]).to_csv(
+        slopes_file, index=False)
+
+    if not rows:
+        print("No synthetic input sizes benchmarked (benchmark.params.users); scaling files are empty.")
+    print(f"Scaling curves saved to {data_file} and slopes to {slopes_file}.")
+
+###################################### Regression detection ######################################
+
+# Benchmarked commits (8-character prefixes) in history order: "topology" (parents before children)
+# or "date" (committer timestamp)
+def commit_order(order="topology", repo=REPO_PATH, branch_name="master"):
+    if order == "date":
+        command = ["git", "log", branch_name, "--format=%ct %H"]
+    else:
+        command = ["git", "rev-list", "--topo-order", "--reverse", branch_name]
+    try:
+        output = subprocess.run(command, cwd=repo, capture_output=True, text=True, check=True).stdout.split("\n")
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Error reading the commit order of '{os.path.abspath(repo)}': {e}")
+        return []
+    if order == "date":
+        # Stable sort on the timestamp keeps git's order for commits made in the same second
+        lines = sorted(reversed([line.split() for line in output if line]), key=lambda fields: int(fields[0]))
+        return [fields[1][:8] for fields in lines]
+    return [line[:8] for line in output if line]
+
+
+# Observations per commit for every (metric, benchmark) series: the mean per fork or per iteration
+# (analysis.unit) of the execution time from <perf-samples.npz> and of the energy per invocation
+# from the energy sidecar files, for the selected mode and the first @Param combination
+def commit_observations(unit="fork"):
+    score_mode = params.get('benchmark', {}).get('score_mode', 'avgt')
+    series = {}
+    references = {}
+    if os.path.exists(PERF_SAMPLES):
+        samples = load_perf_samples()
+        references = reference_params(samples)
+        samples = samples[(samples["metric"] == "primary") & (samples["mode"] == score_mode)]
+        samples = samples[samples["params"] == samples["commit"].map(references)]
+        keys = ["commit", "benchmark", "fork"] + (["iteration"] if unit == "iteration" else [])
+        weighted = samples.assign(product=samples["value"] * samples["weight"]).groupby(keys, sort=False)
+        means = (weighted["product"].sum() / weighted["weight"].sum()).reset_index(name="mean")
+        for (commit_hash, benchmark), group in means.groupby(["commit", "benchmark"], sort=False):
+            series.setdefault(("time", benchmark), {})[commit_hash] = group["mean"].to_numpy()
+
+    for commit_dir in sorted(glob.glob(os.path.join(ENERGY_DATA, "*"))):
+        commit_hash = os.path.basename(commit_dir)
+        records = reference_records(sidecar_records(commit_hash), references.get(commit_hash))
+        per_unit = {}
+        for record in records:
+            key = (record["benchmark"].rsplit(".", 1)[-1], record.get("pid"), record["iteration"] if unit == "iteration" else 0)
+            total = per_unit.setdefault(key, [0, 0])
+            for i, value in enumerate(record_energy(record)):
+                total[i] += value
+        for (benchmark, _, _), (energy, invocations) in per_unit.items():
+            if invocations:
+                series.setdefault(("energy", benchmark), {}).setdefault(commit_hash, []).append(energy / invocations)
+    return {key: {commit_hash: np.asarray(values, dtype=float) for commit_hash, values in commits.items()}
+            for key, commits in series.items()}
+
+
+# Bootstrap distribution of the mean of every row of <observations> (commits x max observations,
+# NaN padded), resampling each row with replacement; chunked to bound memory
+def bootstrap_means(observations, resamples, rng, chunk=64):
+    counts = np.sum(~np.isnan(observations), axis=1)
+    means = np.empty((len(observations), resamples))
+    for start in range(0, len(observations), chunk):
+        block, block_counts = observations[start:start + chunk], counts[start:start + chunk]
+        picks = (rng.random((len(block), resamples, block.shape[1])) * block_counts[:, None, None]).astype(int)
+        drawn = block[np.arange(len(block))[:, None, None], picks]
+        # Only the first <count> draws of a row are used, so short rows are resampled at their own size
+        used = np.arange(block.shape[1])[None, None, :] < block_counts[:, None, None]
+        means[start:start + chunk] = np.where(used, drawn, 0).sum(axis=2) / block_counts[:, None]
+    return means
+
+
+# Benjamini-Hochberg q-values of <p_values>
+def fdr_q_values(p_values):
+    p_values = np.asarray(p_values, dtype=float)
+    if len(p_values) == 0:
+        return p_values
+    order = np.argsort(p_values)
+    scaled = p_values[order] * len(p_values) / np.arange(1, len(p_values) + 1)
+    q_values = np.empty_like(p_values)
+    q_values[order] = np.minimum(1, np.minimum.accumulate(scaled[::-1])[::-1])
+    return q_values
+
+
+# Test every commit against the previous benchmarked commit in history order for each series:
+# relative change of the mean with a bootstrap confidence interval, Welch's t-test p-value, Cohen's d, and
+# Benjamini-Hochberg q-values over all tests. Returns one row per test.
+def detect_changes(series, order, resamples=2000, alpha=0.05, seed=None):
+    rng = np.random.default_rng(seed)
+    position = {commit_hash: i for i, commit_hash in enumerate(order)}
+    higher_is_better = params.get('benchmark', {}).get('score_mode', 'avgt') == "thrpt"
+    tests = []
+    for (metric, benchmark), commits in series.items():
+        ordered = sorted((commit_hash for commit_hash, values in commits.items()
+                          if commit_hash in position and np.sum(~np.isnan(values)) >= 2), key=position.get)
+        if len(ordered) < 2:
+            continue
+        width = max(len(commits[commit_hash]) for commit_hash in ordered)
+        observations = np.full((len(ordered), width), np.nan)
+        for i, commit_hash in enumerate(ordered):
+            observations[i, :len(commits[commit_hash])] = commits[commit_hash]
+
+        boot = bootstrap_means(observations, resamples, rng)
+        means = np.nanmean(observations, axis=1)
+        variances = np.nanvar(observations, axis=1, ddof=1)
+        counts = np.sum(~np.isnan(observations), axis=1)
+
+        # Adjacent pairs, all at once: commit i against commit i - 1
+        change = boot[1:] / boot[:-1] - 1
+        low, high = np.percentile(change, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=1)
+        # Welch's t-test for the p-value: with a handful of forks per commit a bootstrap p-value is both
+        # too optimistic and floored at 1 / resamples, far above what the FDR correction over thousands
+        # of pairs needs
+        errors = variances / counts
+        se = np.sqrt(errors[1:] + errors[:-1])
+        t = np.divide(means[1:] - means[:-1], se, out=np.zeros(len(se)), where=se > 0)
+        df = np.divide((errors[1:] + errors[:-1]) ** 2,
+                       errors[1:] ** 2 / (counts[1:] - 1) + errors[:-1] ** 2 / (counts[:-1] - 1),
+                       out=np.ones(len(se)), where=se > 0)
+        # Zero variance on both sides: any difference of the means is exact
+        p_values = np.array([incomplete_beta(d / (d + x * x), d / 2, 0.5) if error > 0 else float(before == after)
+                             for x, d, error, before, after in zip(t, df, se, means[:-1], means[1:])])
+        pooled = np.sqrt(((counts[1:] - 1) * variances[1:] + (counts[:-1] - 1) * variances[:-1]) /
+                         (counts[1:] + counts[:-1] - 2))
+        cohens_d = np.divide(means[1:] - means[:-1], pooled, out=np.zeros(len(pooled)), where=pooled > 0)
+        relative = means[1:] / means[:-1] - 1
+        for i in range(len(relative)):
+            worse = relative[i] > 0 if (metric == "energy" or not higher_is_better) else relative[i] < 0
+            tests.append({
+                "Metric": metric, "Benchmark": benchmark,
+                "Commit_Hash": ordered[i + 1], "Previous_Hash": ordered[i],
+                "Kind": "regression" if worse else "improvement",
+                "Before": means[i], "After": means[i + 1],
+                "Rel_Change": relative[i], "CI_Low": low[i], "CI_High": high[i],
+                "Cohens_d": cohens_d[i], "P_Value": p_values[i],
+            })
+    q_values = fdr_q_values([test["P_Value"] for test in tests])
+    for test, q_value in zip(tests, q_values):
+        test["Q_Value"] = q_value
+    return tests
+
+
+# Export the statistically significant regressions and improvements between consecutive commits,
+# largest effect first, to <regressions.csv>
+def export_regressions():
+    analysis = params.get('analysis', {})
+    alpha = analysis.get('alpha', 0.05)
+    order = commit_order(analysis.get('order', 'topology'))
+    tests = detect_changes(commit_observations(analysis.get('unit', 'fork')), order,
+                           analysis.get('bootstrap', 2000), alpha, analysis.get('seed'))
+
+    columns = ["Metric", "Benchmark", "Commit_Hash", "Previous_Hash", "Kind", "Before", "After", "Rel_Change",
+               "CI_Low", "CI_High", "Cohens_d", "P_Value", "Q_Value"]
+    significant = pd.DataFrame(tests, columns=columns)
+    significant = significant[significant["Q_Value"] < alpha]
+    significant = significant.reindex(significant["Rel_Change"].abs().sort_values(ascending=False).index)
+    significant.insert(0, "Rank", range(1, len(significant) + 1))
+    significant.to_csv(RESULTS_PATH + "/regressions.csv", index=False, float_format="%.6g")
+    print(f"{len(significant)} significant changes out of {len(tests)} commit pairs exported to 'regressions.csv'.")
+
+###################################### Refactoring impact ######################################
+
+# Refactoring types of every commit as a sparse COO matrix: (commit hashes, type names, row index,
+# column index, count) with one entry per (commit, type) pair that occurs in the index
+def refactoring_matrix(index_path=RMINER_INDEX):
+    with closing(sqlite3.connect(index_path)) as connection:
+        entries = connection.execute("SELECT sha1, type, COUNT(*) FROM refactorings GROUP BY sha1, type").fetchall()
+    commit_hashes = sorted({sha1[:8] for sha1, _, _ in entries})
+    types = sorted({refactoring_type for _, refactoring_type, _ in entries})
+    commit_index = {commit_hash: i for i, commit_hash in enumerate(commit_hashes)}
+    type_index = {refactoring_type: i for i, refactoring_type in enumerate(types)}
+    rows = np.array([commit_index[sha1[:8]] for sha1, _, _ in entries], dtype=np.int64)
+    columns = np.array([type_index[refactoring_type] for _, refactoring_type, _ in entries], dtype=np.int64)
+    counts = np.array([count for _, _, count in entries], dtype=float)
+    return commit_hashes, types, rows, columns, counts
+
+
+# Impact of each refactoring type on every (metric, benchmark) series. Each benchmarked commit is
+# compared with the previous benchmarked commit in history (its parent when that was benchmarked)
+# and is charged with the refactorings of every commit in between, itself included. The impact
+# of a type is the mean relative change of the commits charged with it minus that of the others,
+# with a bootstrap confidence interval over commits. Returns one row per (series, type).
+def refactoring_impact(series, order, matrix, resamples=2000, alpha=0.05, seed=None):
+    rng = np.random.default_rng(seed)
+    position = {commit_hash: i for i, commit_hash in enumerate(order)}
+    commit_hashes, types, rows, columns, counts = matrix
+    refactoring_positions = np.array([position.get(commit_hash, -1) for commit_hash in commit_hashes])[rows]
+    results = []
+    for (metric, benchmark), commits in series.items():
+        ordered = sorted((commit_hash for commit_hash in commits if commit_hash in position), key=position.get)
+        if len(ordered) < 3:
+            continue
+        means = np.array([np.nanmean(commits[commit_hash]) for commit_hash in ordered])
+        change = means[1:] / means[:-1] - 1
+        bounds = np.array([position[commit_hash] for commit_hash in ordered])
+
+        # Benchmarked commit k (k >= 1) covers the history positions (bounds[k - 1], bounds[k]]
+        interval = np.searchsorted(bounds, refactoring_positions, side="left") - 1
+        inside = (refactoring_positions > bounds[0]) & (refactoring_positions <= bounds[-1])
+        occurrences = np.zeros((len(change), len(types)))
+        np.add.at(occurrences, (interval[inside], columns[inside]), counts[inside])
+        charged = (occurrences > 0).astype(float)
+
+        # Weights of the resampled commits, B x commits, turn each bootstrap mean into a matrix product
+        weights = np.stack([np.bincount(rng.integers(0, len(change), len(change)), minlength=len(change))
+                            for _ in range(resamples)]).astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            with_sum, with_weight = (weights * change) @ charged, weights @ charged
+            without_sum = (weights * change).sum(axis=1)[:, None] - with_sum
+            without_weight = weights.sum(axis=1)[:, None] - with_weight
+            boot = with_sum / with_weight - without_sum / without_weight
+            low, high = np.nanpercentile(boot, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+            mean_with = change @ charged / charged.sum(axis=0)
+            mean_without = change @ (1 - charged) / (1 - charged).sum(axis=0)
+
+        for j, refactoring_type in enumerate(types):
+            # An impact needs commits both with and without the type
+            if 0 < charged[:, j].sum() < len(change):
+                results.append({
+                    "Metric": metric, "Benchmark": benchmark, "Refactoring_Type": refactoring_type,
+                    "Commits": int(charged[:, j].sum()), "Occurrences": int(occurrences[:, j].sum()),
+                    "Mean_With": mean_with[j], "Mean_Without": mean_without[j],
+                    "Impact": mean_with[j] - mean_without[j], "CI_Low": low[j], "CI_High": high[j],
+                })
+    return results
+
+
+# Export the per-type impact estimates on execution time and energy to <refactoring-impact.csv>,
+# largest impact first within each series
+def export_refactoring_impact():
+    analysis = params.get('analysis', {})
+    results = refactoring_impact(commit_observations(analysis.get('unit', 'fork')),
+                                 commit_order(analysis.get('order', 'topology')), refactoring_matrix(),
+                                 analysis.get('bootstrap', 2000), analysis.get('alpha', 0.05), analysis.get('seed'))
+    columns = ["Metric", "Benchmark", "Refactoring_Type", "Commits", "Occurrences", "Mean_With", "Mean_Without",
+               "Impact", "CI_Low", "CI_High"]
+    impact = pd.DataFrame(results, columns=columns)
+    impact = impact.assign(Magnitude=impact["Impact"].abs()).sort_values(
+        ["Metric", "Benchmark", "Magnitude"], ascending=[True, True, False], kind="mergesort")
+    impact.drop(columns="Magnitude").to_csv(RESULTS_PATH + "/refactoring-impact.csv", index=False, float_format="%.6g")
+    print(f"Impact of {impact['Refactoring_Type'].nunique()} refactoring types exported to 'refactoring-impact.csv'.")
+
 ###################################### Energy and Performance combined score ######################################
-# File paths
-plot_data_file = RESULTS_PATH + "/energy-data.csv"
-perf_data_file = RESULTS_PATH + "/perf-data/perf-data.csv"
-output_file = RESULTS_PATH + "/energy-perf-cmb.csv"
-
-# Read plot_data.csv
-average_data = {}
-with open(plot_data_file, mode="r") as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        hash_value = row.get("HASH")
-        average = row.get("AVERAGE")
-        if hash_value and average:
-            average_data[hash_value.strip()] = average.strip()
-
-# Update perf-data.csv
-with open(perf_data_file, mode="r") as infile, open(output_file, mode="w", newline="") as outfile:
-    reader = csv.DictReader(infile)
-    fieldnames = reader.fieldnames + ["Energy_Avg_(uj)"]  # Add new field for performance
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-
-    # Write headers
-    writer.writeheader()
-
-    # Write rows with added Performance column
-    for row in reader:
-        commit_hash = row.get("Commit_Hash").strip()
-        row["Energy_Avg_(uj)"] = average_data.get(commit_hash, "")  # Match and add Average value
-        writer.writerow(row)
-
-print(f"Updated file created at: {output_file}")
\ No newline at end of file
+# Join the energy averages onto the performance scores in <energy-perf-cmb.csv>
+def combine_energy_perf():
+    # File paths
+    plot_data_file = RESULTS_PATH + "/energy-data.csv"
+    perf_data_file = RESULTS_PATH + "/perf-data/perf-data.csv"
+    output_file = RESULTS_PATH + "/energy-perf-cmb.csv"
+
+    # Read plot_data.csv
+    average_data = {}
+    with open(plot_data_file, mode="r") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            hash_value = row.get("HASH")
+            average = row.get("AVERAGE")
+            if hash_value and average:
+                average_data[hash_value.strip()] = average.strip()
+
+    # Update perf-data.csv
+    with open(perf_data_file, mode="r") as infile, open(output_file, mode="w", newline="") as outfile:
+        reader = csv.DictReader(infile)
+        fieldnames = reader.fieldnames + ["Energy_Avg_(uj)"]  # Add new field for performance
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+
+        # Write headers
+        writer.writeheader()
+
+        # Write rows with added Performance column
+        for row in reader:
+            commit_hash = row.get("Commit_Hash").strip()
+            row["Energy_Avg_(uj)"] = average_data.get(commit_hash, "")  # Match and add Average value
+            writer.writerow(row)
+
+    print(f"Updated file created at: {output_file}")
+
+
+###################################### Pipeline ######################################
+# Clone the repository, or in incremental mode fetch new commits into the existing clone
+def clone_or_update(repo_url, incremental):
+    if not os.path.isdir(os.path.join(REPO_PATH, ".git")):
+        return clone_repository(repo_url, REPO_PATH)
+    return update_repository(REPO_PATH) if incremental else True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ENTRAN: energy trend analysis on OSS Java libraries")
+    parser.add_argument("--fresh", action="store_true", help="ignore <checkpoint.json> and run every stage again")
+    subparsers = parser.add_subparsers(dest="command")
+    bisect_parser = subparsers.add_parser("bisect", help="find the first commit between two benchmarked commits "
+                                                         "whose change is significant")
+    bisect_parser.add_argument("good", help="earlier commit, before the change")
+    bisect_parser.add_argument("bad", help="later commit, after the change")
+    bisect_parser.add_argument("--metric", choices=["time", "energy"], default="time", help="metric to bisect on")
+    bisect_parser.add_argument("--benchmark", help="benchmark method to bisect on (default: the one that changed most)")
+    args = parser.parse_args()
+
+    if args.command == "bisect":
+        return bisect_commits(args.good, args.bad, args.metric, args.benchmark)
+
+    if args.fresh and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    checkpoint = load_checkpoint()
+
+    repo_url = params['repo']['repo_url']  # "https://github.com/x-stream/xstream.git"
+    incremental = params.get('rminer', {}).get('incremental', False)
+    commits_insights = RESULTS_PATH + '/commits-insights.csv'
+    energy_data = RESULTS_PATH + '/energy-data.csv'
+    perf_data = PERF_DATA + '/perf-data.csv'
+
+    # (name, function, inputs evaluated when the stage is reached, outputs that must exist)
+    # A completed build stage runs again when a JAR of the manifest is gone from COMMIT_JARS
+    stages = [
+        ("clone", lambda: clone_or_update(repo_url, incremental),
+         lambda: [repo_url, remote_head(repo_url) if incremental else ""], [os.path.join(REPO_PATH, ".git")]),
+        ("install", install_repository,
+         lambda: [git_head(), params['repo']], []),
+        ("refactoring_miner", lambda: run_refactoring_miner(REPO_PATH, RMINER_JSON_OUTPUT, branch_name='master'),
+         lambda: [git_head(), params.get('rminer', {})], [RMINER_JSON_OUTPUT]),
+        ("refactoring_index", build_rminer_index,
+         lambda: [RMINER_JSON_OUTPUT], [RMINER_INDEX]),
+        ("commits_insights", export_commits_insights,
+         lambda: [git_head(), RMINER_JSON_OUTPUT], [commits_insights]),
+        ("type_counts", export_type_counts,
+         lambda: [RMINER_JSON_OUTPUT], [RESULTS_PATH + '/refs-type-counts.csv']),
+        ("build", lambda: build_filtered_commits(checkpoint),
+         lambda: [checkpoint["stages"]["commits_insights"]["inputs"], params.get('build', {})],
+         lambda: [JARS_MANIFEST] + manifest_jar_paths()),
+        ("harness", build_benchmark_harness,
+         lambda: [JMH_PATH + "/pom.xml"] + sorted(glob.glob(JMH_PATH + "/src/**/*.java", recursive=True)),
+         [BENCHMARK_JAR]),
+        ("benchmark", lambda: process_jars(checkpoint),
+         lambda: [JARS_MANIFEST, BENCHMARK_JAR, params.get('benchmark', {})], []),
+        ("parent_deltas", lambda: benchmark_parents(checkpoint),
+         lambda: [JARS_MANIFEST, BENCHMARK_JAR, params.get('benchmark', {}), params.get('build', {}),
+                  params.get('energy', {}), params.get('analysis', {}).get('alpha', 0.05)], []),
+        ("perf_samples", ingest_perf_samples,
+         lambda: [PERF_SAMPLE_COLUMNS, PERF_SUMMARY_COLUMNS] + sorted(glob.glob(PERF_DATA + "/*-perf-data.json")),
+         [PERF_SAMPLES]),
+        ("energy", export_energy_data,
+         lambda: [commits_insights, PERF_SAMPLES] + sorted(glob.glob(JMH_RESULTS + "/*")) +
+                 sorted(glob.glob(ENERGY_DATA + "/**/*.jsonl", recursive=True)),
+         [energy_data, RESULTS_PATH + '/energy-domains.csv']),
+        ("performance", export_perf_data,
+         lambda: [commits_insights, params.get('benchmark', {}).get('score_mode', 'avgt'), PERF_SAMPLES] +
+                 sorted(glob.glob(RUN_INFO + "/*.json")),
+         [perf_data]),
+        ("secondary_metrics", export_secondary_metrics,
+         lambda: [params.get('benchmark', {}).get('score_mode', 'avgt'), PERF_SAMPLES],
+         [PERF_DATA + "/secondary-metrics.csv"]),
+        ("scaling", export_scaling_data,
+         lambda: [params.get('benchmark', {}).get('score_mode', 'avgt'), PERF_SAMPLES] +
+                 sorted(glob.glob(JMH_RESULTS + "/*")) + sorted(glob.glob(ENERGY_DATA + "/**/*.jsonl", recursive=True)),
+         [RESULTS_PATH + "/scaling-data.csv", RESULTS_PATH + "/scaling-slopes.csv"]),
+        ("regressions", export_regressions,
+         lambda: [git_head(), params.get('analysis', {}), params.get('benchmark', {}).get('score_mode', 'avgt'),
+                  PERF_SAMPLES] + sorted(glob.glob(ENERGY_DATA + "/**/*.jsonl", recursive=True)),
+         [RESULTS_PATH + "/regressions.csv"]),
+        ("refactoring_impact", export_refactoring_impact,
+         lambda: [git_head(), RMINER_INDEX, params.get('analysis', {}), params.get('benchmark', {}).get('score_mode', 'avgt'),
+                  PERF_SAMPLES] + sorted(glob.glob(ENERGY_DATA + "/**/*.jsonl", recursive=True)),
+         [RESULTS_PATH + "/refactoring-impact.csv"]),
+        ("energy_performance", combine_energy_perf,
+         lambda: [energy_data, perf_data], [RESULTS_PATH + "/energy-perf-cmb.csv"]),
+    ]
+    for name, func, inputs, outputs in stages:
+        if not run_stage(checkpoint, name, func, inputs(), outputs):
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    # A failed stage or bisect exits with status 1
+    sys.exit(0 if main() is not False else 1)
@@ -4,49 +4,77 @@ import com.thoughtworks.xstream.XStream;
 import com.thoughtworks.xstream.io.xml.StaxDriver;
 import com.thoughtworks.xstream.security.AnyTypePermission;
 import org.openjdk.jmh.annotations.*;
-import org.openjdk.jmh.infra.Blackhole;
 import org.openjdk.jmh.results.format.ResultFormatType;
 import org.openjdk.jmh.runner.Runner;
 import org.openjdk.jmh.runner.options.Options;
 import org.openjdk.jmh.runner.options.OptionsBuilder;
 
 import java.io.*;
-import java.lang.management.ManagementFactory;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Paths;
 import java.util.concurrent.TimeUnit;
 
+@Warmup(iterations = 2, time = 3)
+@Measurement(iterations = 2, time = 5)
+// Defaults only: autoflow.py passes the modes, forks and iterations from params.yaml to JMH
+@BenchmarkMode(Mode.AverageTime)
+@OutputTimeUnit(TimeUnit.SECONDS)
 public class App {
-    @Benchmark
-    @Warmup(iterations = 2, time = 3)
-    @Measurement(iterations = 2, time = 5)
-    //@BenchmarkMode(Mode.AverageTime)
-    @BenchmarkMode({Mode.All})
-    @OutputTimeUnit(TimeUnit.SECONDS)
-    public Void benchmarkSerializationWithGSON(Blackhole bh) {
-        try {
-            Energy j = new Energy();
-            j.init();
-            XStream xstream = new XStream(new StaxDriver());
+
+    // XStream configured once per trial, with the input document held in memory
+    @State(Scope.Benchmark)
+    public static class XStreamState {
+        // Relative paths are resolved against the directory JMH is started from
+        @Param({"users5000-10.xml"})
+        public String inputPath;
+
+        // With users > 0 the input is generated by UserGenerator instead of read from inputPath
+        @Param({"0"})
+        public int users;
+
+        @Param({"10"})
+        public int friends;
+
+        @Param({"5"})
+        public int tags;
+
+        public XStream xstream;
+        public String xml;
+        public AUser[] input;
+
+        @Setup(Level.Trial)
+        public void setup() throws IOException {
+            xstream = new XStream(new StaxDriver());
             xstream.addPermission(AnyTypePermission.ANY);
             xstream.alias("row", AUser.class);
             xstream.alias("friend", Friend.class);
             xstream.alias("root", AUser[].class);
             xstream.addImplicitCollection(AUser.class, "tags", String.class);
             xstream.addImplicitCollection(AUser.class, "friends", Friend.class);
-            File xmlFile = new File("/home/waheed/.local/share/JetBrains/users5000-10.xml");
-            AUser[] users = (AUser[]) xstream.fromXML(new FileInputStream(xmlFile));
-            Writer writer = new FileWriter(new File("/home/waheed/.local/share/JetBrains/marshalled"));
-            writer.write(xstream.toXML(users));
-            writer.close();
-            j.stop();
-            System.out.print(j.getEnergy() + "+ ");
-        } catch (IOException e) {
-            e.printStackTrace();
+            if (users > 0) {
+                input = UserGenerator.generate(users, friends, tags, 42);
+                xml = xstream.toXML(input);
+            } else {
+                xml = new String(Files.readAllBytes(Paths.get(inputPath)), StandardCharsets.UTF_8);
+                input = (AUser[]) xstream.fromXML(xml);
+            }
         }
-        return null;
     }
+
+    @Benchmark
+    public Object fromXML(XStreamState state, EnergyState energy) {
+        return state.xstream.fromXML(state.xml);
+    }
+
+    @Benchmark
+    public String toXML(XStreamState state, EnergyState energy) {
+        return state.xstream.toXML(state.input);
+    }
+
     public static void main(String... args) throws Exception {
         Options opts = new OptionsBuilder()
-                .include(App.class.getSimpleName())
+                .include(App.class.getName() + "\\.")  // Not SampledApp
 //                .resultFormat(ResultFormatType.CSV)
 //                .result("../assigned_tasks/Final-Results/XSTREAM-Results/result.csv")
                 .forks(1)
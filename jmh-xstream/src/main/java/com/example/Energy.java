@@ -1,35 +1,177 @@
 package com.example;
 
-import java.io.BufferedReader;
+import java.io.Closeable;
 import java.io.File;
-import java.io.FileReader;
 import java.io.IOException;
-import java.util.Arrays;
+import java.nio.ByteBuffer;
+import java.nio.channels.FileChannel;
+import java.nio.file.Files;
+import java.nio.file.Paths;
+import java.nio.file.StandardOpenOption;
+import java.util.ArrayList;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
 
-public class Energy {
-    private final String root = "/sys/devices/virtual/powercap/intel-rapl/intel-rapl:";
-    private final int cpuCount = 1;
-    private long energies[];
+// RAPL energy probe over every powercap domain: packages (intel-rapl:N) and their subdomains
+// (intel-rapl:N:M, e.g. core, uncore, dram). The energy_uj files stay open and are read with
+// positional reads, so init() and stop() do no allocation or path lookups. The powercap root can
+// be moved with -Denergy.root=<dir> to test against a fake tree, and -Denergy.package=<n> limits
+// the probe to package-<n> when concurrent runs are pinned to different packages.
+public class Energy implements Closeable {
+    public static final String DEFAULT_ROOT = "/sys/devices/virtual/powercap/intel-rapl";
 
-    public Energy() {
-        this.energies = new long[cpuCount];
+    private final String[] names;
+    private final FileChannel[] channels;
+    private final long[] maxRanges;
+    // Domains counted in getEnergy(): the packages. Subdomains are part of their package, and
+    // psys (platform) overlaps with the packages.
+    private final boolean[] counted;
+    private final long[] energies;
+    private final ByteBuffer buffer = ByteBuffer.allocate(32);
+
+    public Energy() throws IOException {
+        this(System.getProperty("energy.root", DEFAULT_ROOT), System.getProperty("energy.package"));
+    }
+
+    public Energy(String root) throws IOException {
+        this(root, null);
+    }
+
+    // Only the domains of package-<onlyPackage> when it is not null
+    public Energy(String root, String onlyPackage) throws IOException {
+        List<File> packages = domains(new File(root));
+        List<String> domainNames = new ArrayList<>();
+        List<File> directories = new ArrayList<>();
+        List<Boolean> packageLevel = new ArrayList<>();
+        for (File pkg : packages) {
+            String packageName = name(pkg);
+            if (onlyPackage != null && !packageName.equals("package-" + onlyPackage)) {
+                continue;
+            }
+            domainNames.add(packageName);
+            directories.add(pkg);
+            packageLevel.add(!packageName.startsWith("psys"));
+            for (File subdomain : domains(pkg)) {
+                domainNames.add(packageName + "/" + name(subdomain));
+                directories.add(subdomain);
+                packageLevel.add(false);
+            }
+        }
+        if (directories.isEmpty()) {
+            throw new IOException("No RAPL domains under " + root + (onlyPackage == null ? "" : " for package-" + onlyPackage));
+        }
+
+        int count = directories.size();
+        names = domainNames.toArray(new String[0]);
+        channels = new FileChannel[count];
+        maxRanges = new long[count];
+        counted = new boolean[count];
+        energies = new long[count];
+        for (int i = 0; i < count; i++) {
+            File directory = directories.get(i);
+            channels[i] = FileChannel.open(new File(directory, "energy_uj").toPath(), StandardOpenOption.READ);
+            File maxRange = new File(directory, "max_energy_range_uj");
+            maxRanges[i] = maxRange.exists() ? Long.parseLong(read(maxRange)) : 0;
+            counted[i] = packageLevel.get(i);
+        }
     }
 
     public void init() throws IOException {
-        for (int i = 0; i < cpuCount; i++) {
-            this.energies[i] = Long.parseLong(new BufferedReader(new FileReader(root + i + "/energy_uj")).readLine());
+        for (int i = 0; i < channels.length; i++) {
+            energies[i] = counter(i);
         }
-//        return;
     }
 
     public void stop() throws IOException {
-        for (int i = 0; i < cpuCount; i++) {
-            this.energies[i] = Long.parseLong(new BufferedReader(new FileReader(root + i + "/energy_uj")).readLine()) - this.energies[i];
+        for (int i = 0; i < channels.length; i++) {
+            long delta = counter(i) - energies[i];
+            // The counter wrapped around at max_energy_range_uj since init()
+            if (delta < 0) {
+                delta += maxRanges[i];
+            }
+            energies[i] = delta;
         }
-//        return;
     }
 
+    // Microjoules of all packages between init() and stop()
     public long getEnergy() {
-        return Arrays.stream(this.energies).sum();
+        long total = 0;
+        for (int i = 0; i < energies.length; i++) {
+            if (counted[i]) {
+                total += energies[i];
+            }
+        }
+        return total;
+    }
+
+    // Add the microjoules of every domain between init() and stop() to <totals>, in the order of getDomainNames()
+    public void addDomainEnergies(long[] totals) {
+        for (int i = 0; i < energies.length; i++) {
+            totals[i] += energies[i];
+        }
+    }
+
+    // Joules of every domain between init() and stop(), e.g. {"package-0": .., "package-0/dram": ..}
+    public Map<String, Double> getDomainJoules() {
+        Map<String, Double> joules = new LinkedHashMap<>();
+        for (int i = 0; i < names.length; i++) {
+            joules.put(names[i], energies[i] / 1e6);
+        }
+        return joules;
+    }
+
+    public String[] getDomainNames() {
+        return names.clone();
+    }
+
+    @Override
+    public void close() throws IOException {
+        for (FileChannel channel : channels) {
+            channel.close();
+        }
+    }
+
+    private long counter(int domain) throws IOException {
+        buffer.clear();
+        int length = channels[domain].read(buffer, 0);
+        long value = 0;
+        for (int i = 0; i < length; i++) {
+            byte digit = buffer.get(i);
+            if (digit < '0' || digit > '9') {
+                break;
+            }
+            value = value * 10 + (digit - '0');
+        }
+        return value;
+    }
+
+    // intel-rapl:<n>[:<m>] directories directly below <parent>, in numeric order
+    private static List<File> domains(File parent) {
+        List<File> domains = new ArrayList<>();
+        File[] children = parent.listFiles();
+        if (children == null) {
+            return domains;
+        }
+        String prefix = parent.getName().startsWith("intel-rapl:") ? parent.getName() + ":" : "intel-rapl:";
+        for (File child : children) {
+            String suffix = child.getName().startsWith(prefix) ? child.getName().substring(prefix.length()) : "";
+            if (suffix.matches("\\d+") && new File(child, "energy_uj").exists()) {
+                domains.add(child);
+            }
+        }
+        domains.sort((a, b) -> Integer.compare(
+                Integer.parseInt(a.getName().substring(prefix.length())),
+                Integer.parseInt(b.getName().substring(prefix.length()))));
+        return domains;
+    }
+
+    private static String name(File domain) throws IOException {
+        File name = new File(domain, "name");
+        return name.exists() ? read(name) : domain.getName();
+    }
+
+    private static String read(File file) throws IOException {
+        return new String(Files.readAllBytes(Paths.get(file.getPath()))).trim();
     }
 }
@@ -0,0 +1,91 @@
+package com.example;
+
+import org.openjdk.jmh.annotations.*;
+
+import java.io.*;
+import java.util.Arrays;
+
+// Energy of every invocation, read from RAPL around it, for runs without the out-of-band sampler.
+// The iteration records of IterationEnergyState get the invocation readings added:
+//   {.., "ops": n, "samples": [uj, ..], "domains": {"package-0": joules, "package-0/dram": joules, ..}}
+// where samples are the package energy of each invocation, ops their number and domains the
+// iteration totals. Without energy.dir the readings are printed as "<microjoules>+ " like before.
+@State(Scope.Thread)
+public class EnergyState extends IterationEnergyState {
+    private long[] samples = new long[1024];
+    private int sampleCount;
+    private long[] domainTotals;
+    private long ops;
+    private Energy energy;
+
+    @Setup(Level.Trial)
+    public void openProbe() {
+        try {
+            energy = new Energy();
+            domainTotals = new long[energy.getDomainNames().length];
+        } catch (IOException e) {
+            System.err.println("Energy probe unavailable: " + e.getMessage());
+            energy = null;
+        }
+    }
+
+    @Setup(Level.Iteration)
+    public void resetReadings() {
+        sampleCount = 0;
+        ops = 0;
+        if (domainTotals != null) {
+            Arrays.fill(domainTotals, 0);
+        }
+    }
+
+    @Setup(Level.Invocation)
+    public void start() throws IOException {
+        if (energy != null) {
+            energy.init();
+        }
+    }
+
+    @TearDown(Level.Invocation)
+    public void stop() {
+        ops++;
+        if (energy == null) {
+            return;
+        }
+        try {
+            energy.stop();
+        } catch (IOException e) {
+            e.printStackTrace();
+            return;
+        }
+        if (!hasSidecar()) {
+            System.out.print(energy.getEnergy() + "+ ");
+            return;
+        }
+        if (sampleCount == samples.length) {
+            samples = Arrays.copyOf(samples, samples.length * 2);
+        }
+        samples[sampleCount++] = energy.getEnergy();
+        energy.addDomainEnergies(domainTotals);
+    }
+
+    @Override
+    protected void appendReadings(StringBuilder line) {
+        line.append(", \"ops\": ").append(ops).append(", \"samples\": [");
+        for (int i = 0; i < sampleCount; i++) {
+            line.append(i == 0 ? "" : ", ").append(samples[i]);
+        }
+        line.append("], \"domains\": {");
+        String[] domainNames = energy == null ? new String[0] : energy.getDomainNames();
+        for (int i = 0; i < domainNames.length; i++) {
+            line.append(i == 0 ? "" : ", ").append(quote(domainNames[i])).append(": ").append(domainTotals[i] / 1e6);
+        }
+        line.append("}");
+    }
+
+    @TearDown(Level.Trial)
+    public void closeProbe() throws IOException {
+        if (energy != null) {
+            energy.close();
+        }
+    }
+}
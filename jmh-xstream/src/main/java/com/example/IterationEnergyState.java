@@ -0,0 +1,111 @@
+package com.example;
+
+import org.openjdk.jmh.annotations.*;
+import org.openjdk.jmh.infra.BenchmarkParams;
+import org.openjdk.jmh.infra.IterationParams;
+import org.openjdk.jmh.runner.IterationType;
+
+import java.io.*;
+import java.lang.management.ManagementFactory;
+import java.nio.charset.StandardCharsets;
+
+// Iteration boundaries for the out-of-band energy sampler of autoflow.py. There are only trial
+// and iteration fixtures, so nothing runs around the measured invocations. With -Denergy.dir set,
+// each fork appends one JSON line per iteration to <energy.dir>/energy-<pid>.jsonl:
+//   {"pid": .., "benchmark": .., "params": {..}, "phase": "warmup"|"measurement", "iteration": n,
+//    "start_ns": .., "end_ns": ..}
+// where start_ns/end_ns are System.nanoTime() (CLOCK_MONOTONIC) around the iteration. autoflow.py
+// integrates the sampled energy between them and takes the operations of the iteration from the
+// JMH result. EnergyState adds per-invocation readings for runs without the sampler.
+@State(Scope.Thread)
+public class IterationEnergyState {
+    private Writer sidecar;
+    private String pid;
+    private String benchmark;
+    private String params;
+    private String phase;
+    private int warmupIterations;
+    private int measurementIterations;
+    private long iterationStart;
+
+    @Setup(Level.Trial)
+    public void open(BenchmarkParams benchmarkParams) throws IOException {
+        String directory = System.getProperty("energy.dir");
+        if (directory == null) {
+            return;
+        }
+        pid = ManagementFactory.getRuntimeMXBean().getName().split("@")[0];
+        benchmark = benchmarkParams.getBenchmark();
+        StringBuilder builder = new StringBuilder("{");
+        for (String key : benchmarkParams.getParamsKeys()) {
+            if (builder.length() > 1) {
+                builder.append(", ");
+            }
+            builder.append(quote(key)).append(": ").append(quote(benchmarkParams.getParam(key)));
+        }
+        params = builder.append("}").toString();
+        File file = new File(directory, "energy-" + pid + ".jsonl");
+        sidecar = new BufferedWriter(new OutputStreamWriter(new FileOutputStream(file, true), StandardCharsets.UTF_8));
+    }
+
+    @Setup(Level.Iteration)
+    public void beginIteration(IterationParams iterationParams) {
+        boolean warmup = iterationParams.getType() == IterationType.WARMUP;
+        phase = warmup ? "warmup" : "measurement";
+        if (warmup) {
+            warmupIterations++;
+        } else {
+            measurementIterations++;
+        }
+        iterationStart = System.nanoTime();
+    }
+
+    @TearDown(Level.Iteration)
+    public void endIteration() throws IOException {
+        long iterationEnd = System.nanoTime();
+        if (sidecar == null) {
+            return;
+        }
+        StringBuilder line = new StringBuilder()
+                .append("{\"pid\": ").append(pid)
+                .append(", \"benchmark\": ").append(quote(benchmark))
+                .append(", \"params\": ").append(params)
+                .append(", \"phase\": ").append(quote(phase))
+                .append(", \"iteration\": ").append("warmup".equals(phase) ? warmupIterations : measurementIterations)
+                .append(", \"start_ns\": ").append(iterationStart)
+                .append(", \"end_ns\": ").append(iterationEnd);
+        appendReadings(line);
+        sidecar.write(line.append("}\n").toString());
+        sidecar.flush();
+    }
+
+    @TearDown(Level.Trial)
+    public void close() throws IOException {
+        if (sidecar != null) {
+            sidecar.close();
+        }
+    }
+
+    // Extra fields of the iteration's JSON line, each starting with ", "
+    protected void appendReadings(StringBuilder line) {
+    }
+
+    // Whether iteration records are written (-Denergy.dir is set)
+    protected boolean hasSidecar() {
+        return sidecar != null;
+    }
+
+    protected static String quote(String value) {
+        StringBuilder quoted = new StringBuilder("\"");
+        for (char c : value.toCharArray()) {
+            if (c == '"' || c == '\\') {
+                quoted.append('\\').append(c);
+            } else if (c < 0x20) {
+                quoted.append(String.format("\\u%04x", (int) c));
+            } else {
+                quoted.append(c);
+            }
+        }
+        return quoted.append('"').toString();
+    }
+}
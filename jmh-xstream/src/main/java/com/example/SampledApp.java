@@ -0,0 +1,25 @@
+package com.example;
+
+import org.openjdk.jmh.annotations.*;
+
+import java.util.concurrent.TimeUnit;
+
+// The benchmarks of App for runs with the out-of-band energy sampler: IterationEnergyState only
+// marks the iterations, so no fixture runs around the measured invocations. autoflow.py selects
+// this class or App with a JMH include pattern.
+@Warmup(iterations = 2, time = 3)
+@Measurement(iterations = 2, time = 5)
+@BenchmarkMode(Mode.AverageTime)
+@OutputTimeUnit(TimeUnit.SECONDS)
+public class SampledApp {
+
+    @Benchmark
+    public Object fromXML(App.XStreamState state, IterationEnergyState energy) {
+        return state.xstream.fromXML(state.xml);
+    }
+
+    @Benchmark
+    public String toXML(App.XStreamState state, IterationEnergyState energy) {
+        return state.xstream.toXML(state.input);
+    }
+}
@@ -0,0 +1,62 @@
+package com.example;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Random;
+import java.util.UUID;
+
+// Synthetic users shaped like users5000-10.xml, reproducible for a given seed
+public class UserGenerator {
+    private static final String[] EYE_COLORS = {"blue", "brown", "green"};
+    private static final String[] FRUITS = {"apple", "banana", "strawberry"};
+    private static final String[] WORDS = {"lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing",
+            "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "labore", "magna", "aliqua"};
+
+    public static AUser[] generate(int users, int friends, int tags, long seed) {
+        Random random = new Random(seed);
+        AUser[] result = new AUser[users];
+        for (int i = 0; i < users; i++) {
+            AUser user = new AUser();
+            user.id = Long.toHexString(random.nextLong());
+            user.index = i;
+            user.guid = new UUID(random.nextLong(), random.nextLong()).toString();
+            user.isActive = random.nextBoolean();
+            user.balance = String.format("$%,.2f", random.nextDouble() * 4000);
+            user.picture = "http://placehold.it/32x32";
+            user.age = 20 + random.nextInt(50);
+            user.eyeColor = EYE_COLORS[random.nextInt(EYE_COLORS.length)];
+            user.name = words(random, 2);
+            user.gender = random.nextBoolean() ? "male" : "female";
+            user.company = words(random, 1).toUpperCase();
+            user.email = user.name.replace(' ', '.') + "@example.com";
+            user.phone = String.format("+1 (%03d) %03d-%04d", random.nextInt(1000), random.nextInt(1000), random.nextInt(10000));
+            user.address = random.nextInt(1000) + " " + words(random, 2) + " Street";
+            user.about = words(random, 20);
+            user.registered = String.format("20%02d-%02d-%02dT00:00:00", random.nextInt(25), 1 + random.nextInt(12), 1 + random.nextInt(28));
+            user.latitude = random.nextDouble() * 180 - 90;
+            user.longitude = random.nextDouble() * 360 - 180;
+            user.tags = new ArrayList<>(tags);
+            for (int t = 0; t < tags; t++) {
+                user.tags.add(words(random, 1));
+            }
+            user.friends = new ArrayList<>(friends);
+            for (int f = 0; f < friends; f++) {
+                Friend friend = new Friend();
+                friend.id = f;
+                friend.name = words(random, 2);
+                user.friends.add(friend);
+            }
+            user.favoriteFruit = FRUITS[random.nextInt(FRUITS.length)];
+            result[i] = user;
+        }
+        return result;
+    }
+
+    private static String words(Random random, int count) {
+        List<String> words = new ArrayList<>(count);
+        for (int i = 0; i < count; i++) {
+            words.add(WORDS[random.nextInt(WORDS.length)]);
+        }
+        return String.join(" ", words);
+    }
+}
@@ -3,13 +3,16 @@ import pandas as pd               # Install with: pip install pandas
 import yaml
 import csv
 import os
-import json
+import sqlite3
+import subprocess
+from contextlib import closing
 
 # Variables
 JMH_PATH = "/app/jmh"
 REPO_PATH =  "/app/repo"
 RESULTS_PATH = "/app/results"
 RMINER_JSON_OUTPUT = RESULTS_PATH + "/rminer_result.json"
+RMINER_INDEX = RESULTS_PATH + "/rminer_index.sqlite"
 COMMIT_JARS = RESULTS_PATH + "/commit-jars"
 JMH_RESULTS = RESULTS_PATH + "/jmh-results"
 PERF_DATA = RESULTS_PATH + "/perf-data"
@@ -28,8 +31,11 @@ params = load_config()
 file_path = RESULTS_PATH + "/energy-perf-cmb.csv"
 data = pd.read_csv(file_path)
 
-# Sort the data by the Year column to ensure commits are ordered correctly
-data = data.sort_values(by="Commit_Hash")
+# Order the commits as in history (parents before children), as autoflow.py's regressions stage does
+history = subprocess.run(["git", "rev-list", "--topo-order", "--reverse", "master"], cwd=REPO_PATH,
+                         capture_output=True, text=True, check=True).stdout.split()
+position = {commit[:8]: i for i, commit in enumerate(history)}
+data = data.assign(Position=data["Commit_Hash"].map(position)).sort_values(by="Position", kind="mergesort")
 
 # Extract required columns for the plot
 commits = data["Commit_Hash"]
@@ -73,6 +79,29 @@ plt.savefig(plot_output_path)
 # Show the plot
 plt.show()
 
+##################################### Scaling curves to <scaling-plot.png> ######################################
+# Time and energy against the synthetic input size, one line per commit (log-log, the slopes are in <scaling-slopes.csv>)
+scaling_path = RESULTS_PATH + "/scaling-data.csv"
+scaling = pd.read_csv(scaling_path) if os.path.exists(scaling_path) else pd.DataFrame()
+
+if not scaling.empty:
+    benchmarks = list(scaling["Benchmark"].unique())
+    fig, axes = plt.subplots(2, len(benchmarks), figsize=(6 * len(benchmarks), 10), squeeze=False)
+    for column, benchmark in enumerate(benchmarks):
+        for row, (metric, label) in enumerate([("Score", "Time (s/op)"), ("Energy_Avg_(uj)", "Energy (uJ)")]):
+            ax = axes[row][column]
+            for commit, curve in scaling[scaling["Benchmark"] == benchmark].groupby("Commit_Hash"):
+                curve = curve.dropna(subset=[metric]).groupby("Elements")[metric].mean()
+                ax.plot(curve.index, curve.values, marker='o', label=commit)
+            ax.set_xscale("log")
+            ax.set_yscale("log")
+            ax.set_xlabel("Input size (elements)")
+            ax.set_ylabel(label)
+            ax.set_title(f"{benchmark}: {label}")
+    axes[0][0].legend(fontsize="small")
+    plt.tight_layout()
+    plt.savefig(os.path.join(RESULTS_PATH, "scaling-plot.png"))
+
 ##################################### Exporting successful commits to <summary-successful-commits.csv> ######################################
 
 # Define the file paths
@@ -110,46 +139,13 @@ def read_commits_from_csv():
     return commits
 
 
-# Read the JSON file and extract the refactorings for each sha1
-def read_refactorings_from_json():
+# Read the refactoring types of each commit from the index built by autoflow.py
+def read_refactorings_from_index(commits):
     refactorings_dict = {}
-
-    with open(RMINER_JSON_OUTPUT, mode='r', encoding='utf-8') as file:
-        data = json.load(file)
-
-        # Print the structure of the data to debug the issue
-        # print("JSON Data Structure:", type(data))  # This will tell us the type of the root object
-        if isinstance(data, dict):  # If the root is a dictionary
-            commits_data = data.get('commits', [])  # Get the 'commits' key
-
-            if isinstance(commits_data, list):
-                current_sha1 = None
-                refactorings = []
-
-                for entry in commits_data:
-                    if isinstance(entry, dict):  # Ensure each commit entry is a dictionary
-                        sha1 = entry.get('sha1')
-                        if sha1:
-                            if current_sha1:
-                                refactorings_dict[current_sha1] = refactorings
-                            current_sha1 = sha1
-                            refactorings = []  # Reset the refactorings list for the new sha1
-
-                        # Add "type" values from the "refactorings" key if available
-                        for refactoring in entry.get('refactorings', []):
-                            if isinstance(refactoring, dict):  # Ensure refactoring is a dict
-                                refactoring_type = refactoring.get('type')
-                                if refactoring_type:
-                                    refactorings.append(refactoring_type)
-
-                # Don't forget the last sha1 entry
-                if current_sha1:
-                    refactorings_dict[current_sha1] = refactorings
-            else:
-                print("Error: The 'commits' key does not contain a list.")
-        else:
-            print("Error: JSON data is not in expected format (root should be a dictionary with 'commits' as a list).")
-
+    with closing(sqlite3.connect(RMINER_INDEX)) as connection:
+        for commit in commits:
+            refactorings_dict[commit] = [row[0] for row in connection.execute(
+                "SELECT type FROM refactorings WHERE sha1 = ? ORDER BY rowid", (commit,))]
     return refactorings_dict
 
 
@@ -185,7 +181,7 @@ def write_to_csv(commit_refactoring_mapping):
 # Main execution
 def main():
     commits = read_commits_from_csv()
-    refactorings_dict = read_refactorings_from_json()
+    refactorings_dict = read_refactorings_from_index(commits)
     commit_refactoring_mapping = map_commits_to_refactorings(commits, refactorings_dict)
     write_to_csv(commit_refactoring_mapping)
 
@@ -1,5 +1,6 @@
 import webbrowser
 import csv
+import os
 
 # Variables
 JMH_PATH = "/app/jmh"
@@ -17,6 +18,10 @@ refacts_mapping = RESULTS_PATH + "/commit-refacts-mapping.csv"
 energy_data_file = RESULTS_PATH + "/energy-data.csv"
 perf_data_file = RESULTS_PATH + "/perf-data/perf-data.csv"
 energy_perf_file = RESULTS_PATH + "/energy-perf-cmb.csv"
+secondary_metrics_file = RESULTS_PATH + "/perf-data/secondary-metrics.csv"
+regressions_file = RESULTS_PATH + "/regressions.csv"
+refactoring_impact_file = RESULTS_PATH + "/refactoring-impact.csv"
+parent_deltas_file = RESULTS_PATH + "/parent-deltas.csv"
 image_file = RESULTS_PATH + "/plot-output.png"
 html_file = RESULTS_PATH + "/results-summary.html"
 
@@ -44,6 +49,25 @@ refacts_mapping_table = read_csv_with_row_numbers(refacts_mapping)
 energy_data = read_csv_with_row_numbers(energy_data_file)
 perf_data = read_csv_with_row_numbers(perf_data_file)
 energy_perf_data = read_csv_with_row_numbers(energy_perf_file)
+# Only has rows when benchmark.profilers is set in params.yaml (missing for older results)
+if os.path.exists(secondary_metrics_file):
+    secondary_metrics = read_csv_with_row_numbers(secondary_metrics_file)
+if not os.path.exists(secondary_metrics_file) or len(secondary_metrics) <= 1:
+    secondary_metrics = [["No profiler results: set benchmark.profilers (gc, perfnorm, stack) in params.yaml"]]
+# Results from before the regressions stage existed have no regressions.csv
+if os.path.exists(regressions_file):
+    regressions = read_csv_with_row_numbers(regressions_file)
+else:
+    regressions = [["No regression analysis: rerun autoflow.py to detect changes between commits"]]
+if os.path.exists(refactoring_impact_file):
+    refactoring_impact = read_csv_with_row_numbers(refactoring_impact_file)
+else:
+    refactoring_impact = [["No refactoring impact analysis: rerun autoflow.py to relate refactoring types to changes"]]
+# Only written when benchmark.parents.enabled is set in params.yaml
+if os.path.exists(parent_deltas_file):
+    parent_deltas = read_csv_with_row_numbers(parent_deltas_file)
+else:
+    parent_deltas = [["No parent-relative results: set benchmark.parents.enabled in params.yaml"]]
 
 # Generate HTML content
 html_content = f"""
@@ -133,13 +157,17 @@ html_content = f"""
         <button onclick="showPage('energy-data')">Energy Data</button>
         <button onclick="showPage('performance-data')">Performance Data</button>
         <button onclick="showPage('energy-performance-data')">Energy + Performance</button>
+        <button onclick="showPage('secondary-metrics')">Profilers</button>
+        <button onclick="showPage('regressions')">Regressions</button>
+        <button onclick="showPage('refactoring-impact')">Refactoring Impact</button>
+        <button onclick="showPage('parent-deltas')">Parent Deltas</button>
         <button onclick="showPage('plot-image')">Plot</button>
     </div>
 
     <!-- Home Page -->
     <div id="home" class="page">
         <h2>Welcome to the Entran Results Summary</h2>
-        <p>Click on the buttons above to view the summary table, refactoring table, energy data, performance data, combined energy and performance data, or plot.</p>
+        <p>Click on the buttons above to view the summary table, refactoring table, energy data, performance data, combined energy and performance data, profiler metrics, regressions, refactoring impact, parent deltas, or plot.</p>
     </div>
 
     <!-- Summary Successful Commits Table -->
@@ -207,6 +235,59 @@ html_content = f"""
         </div>
     </div>
 
+    <!-- Profiler Secondary Metrics Table -->
+    <div id="secondary-metrics" class="page">
+        <h2>Profiler Metrics</h2>
+        <div class="table-container">
+            <table>
+                <tr>
+                    {"".join(f"<th><strong>{cell}</strong></th>" for cell in secondary_metrics[0])}
+                </tr>
+                {"".join(f"<tr>{''.join(f'<td>{cell}</td>' for cell in row)}</tr>" for row in secondary_metrics[1:])}
+            </table>
+        </div>
+    </div>
+
+    <!-- Significant Regressions and Improvements Table -->
+    <div id="regressions" class="page">
+        <h2>Regressions and Improvements</h2>
+        <div class="table-container">
+            <table>
+                <tr>
+                    {"".join(f"<th><strong>{cell}</strong></th>" for cell in regressions[0])}
+                </tr>
+                {"".join(f"<tr>{''.join(f'<td>{cell}</td>' for cell in row)}</tr>" for row in regressions[1:])}
+            </table>
+        </div>
+    </div>
+
+    <!-- Refactoring Type Impact Table -->
+    <div id="refactoring-impact" class="page">
+        <h2>Refactoring Type Impact</h2>
+        <p>Mean relative change of the commits containing each refactoring type minus that of the other commits, with a bootstrap confidence interval.</p>
+        <div class="table-container">
+            <table>
+                <tr>
+                    {"".join(f"<th><strong>{cell}</strong></th>" for cell in refactoring_impact[0])}
+                </tr>
+                {"".join(f"<tr>{''.join(f'<td>{cell}</td>' for cell in row)}</tr>" for row in refactoring_impact[1:])}
+            </table>
+        </div>
+    </div>
+
+    <!-- Paired Commit/Parent Deltas Table -->
+    <div id="parent-deltas" class="page">
+        <h2>Deltas Against the First Parent</h2>
+        <div class="table-container">
+            <table>
+                <tr>
+                    {"".join(f"<th><strong>{cell}</strong></th>" for cell in parent_deltas[0])}
+                </tr>
+                {"".join(f"<tr>{''.join(f'<td>{cell}</td>' for cell in row)}</tr>" for row in parent_deltas[1:])}
+            </table>
+        </div>
+    </div>
+
     <!-- Plot Image -->
     <div id="plot-image" class="page">
         <h2>Plot Output</h2>